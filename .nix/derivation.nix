@@ -12,6 +12,7 @@ stdenvNoCC.mkDerivation {
 
   nativeBuildInputs = [
     python311
+    python311Packages.jinja2
   ];
 
   buildPhase = ''
@@ -21,7 +22,13 @@ stdenvNoCC.mkDerivation {
     mkdir -p $out/bin
     mkdir -p $out/tmpl
     cp $src/src/dispatch.py $out/bin
-    cp $src/src/wip/make_rst.py $out/bin
+    cp $src/src/model.py $out/bin
+    cp $src/src/pipeline.py $out/bin
+    cp $src/src/profiling.py $out/bin
+    cp $src/src/sphinx_api.py $out/bin
+    cp $src/src/make_rst.py $out/bin
     cp -r $src/src/wip/*.rst.tmpl $out/tmpl/
+    # Compile the templates once, make_rst.py loads them from $out/tmpl/compiled
+    python3 $out/bin/make_rst.py -t $out/tmpl --compile-templates
   '';
 }
@@ -26,18 +26,18 @@ stdenvNoCC.mkDerivation {
   ];
 
   buildPhase = ''
-    python3 ${masp.outPath}/bin/dispatch.py -d ${masp-xml.outPath}/xml > cpp_map.json
-    # Ensure file tree exists in source
-    mkdir -p source/cpp_api
-    # C++ and C template generation
-    python3 ${masp.outPath}/bin/make_rst.py --title="C++" -t ${masp.outPath}/tmpl -m cpp_map.json -o source/cpp_api
+    # The C++ API pages are rendered by the sphinx_api extension from the
+    # JSON map, which is also kept for inspection
+    python3 ${masp.outPath}/bin/dispatch.py -d ${masp-xml.outPath}/xml --no-cache -o cpp_map.json
+    export MASP_BIN=${masp.outPath}/bin
+    export MASP_TMPL=${masp.outPath}/tmpl
+    export MASP_MAP=$PWD/cpp_map.json
     make html
   '';
 
   installPhase = ''
-    mkdir -p $out $out/rst $out/json
+    mkdir -p $out $out/json
     mv build/html $out/html
-    mv source/cpp_api $out/rst/cpp_api
     mv cpp_map.json $out/json/
   '';
 }
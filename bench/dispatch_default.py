@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of the default element conversion in dispatch.py
+
+Compares the current `dispatch_default` against the former fold over
+`merge`, which rebuilt the merged dict for every child. Both variants
+convert the same compound files, their results are checked for equality.
+"""
+import argparse
+import sys
+import time
+from functools import reduce
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import dispatch as D
+
+
+def reference_dispatch_default(expr, ctx):
+    def merge(a: dict, b: dict):
+        common_keys = set(a.keys()) & set(b.keys())
+        unique_kwargs = [(k, a[k]) for k in set(a.keys()) - common_keys] + [(k, b[k]) for k in
+                                                                            set(b.keys()) - common_keys]
+        shared_kwargs = [(k, D.as_list(a[k]) + D.as_list(b[k])) for k in common_keys]
+        merged = dict(unique_kwargs + shared_kwargs)
+        if "#text" in merged:
+            merged["#text"] = "".join(merged["#text"])
+        return merged
+
+    tag = expr.tag
+    attribs = {f"@{k}": v for k, v in expr.attributes.items()}
+    data = {tag: reduce(merge, expr.children, attribs)}
+
+    if tag in D.NO_TEXT:
+        if "#text" in data[tag]:
+            del data[tag]["#text"]
+    if tag in D.FORCE_LIST:
+        data = {tag: D.as_list(data[tag])}
+
+    return data
+
+
+IMPLEMENTATIONS = {
+    "reduce/merge": reference_dispatch_default,
+    "accumulator": D.dispatch_default,
+}
+
+
+def time_files(files, ctx, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = [D.dispatch_compound(f, ctx)[0] for f in files]
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def time_wide_element(n, repeat):
+    children = []
+    for i in range(n):
+        children.append({"member": {"@refid": f"id{i}", "name": f"member{i}"}})
+        children.append({"#text": "\n"})
+    expr = D.Element("listofallmembers", {}, children, None)
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = D.dispatch_default(expr, None)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-d', '--doxygen', default=D.gko_directory,
+                        help="Path to the doxygen generated xml directory, e.g. the Ginkgo xml")
+    parser.add_argument('-b', '--backend', choices=D.backends.keys(), default="minidom")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help="Best of this many runs is reported")
+    parser.add_argument('--wide', type=int, nargs="*", default=[1000, 4000, 16000],
+                        help="Number of children of the synthetic wide elements")
+    args = parser.parse_args()
+
+    ctx = D.Context(directory=args.doxygen, backend=args.backend)
+    files = sorted(str(f) for f in Path(args.doxygen).glob("*.xml") if f.name != "index.xml")
+
+    results = {}
+    for name, impl in IMPLEMENTATIONS.items():
+        D.dispatch_default = impl
+        results[name] = [time_files(files, ctx, args.repeat)]
+        results[name] += [time_wide_element(n, args.repeat) for n in args.wide]
+    D.dispatch_default = IMPLEMENTATIONS["accumulator"]
+
+    cases = [f"{len(files)} compound files"] + [f"element with {n} children" for n in args.wide]
+    old, new = results.values()
+    print(f"{'case':<30}{'reduce/merge':>15}{'accumulator':>15}{'speedup':>10}")
+    for case, (t_old, r_old), (t_new, r_new) in zip(cases, old, new):
+        if r_old != r_new:
+            raise RuntimeError(f"Results differ for {case}")
+        print(f"{case:<30}{t_old:>14.3f}s{t_new:>14.3f}s{t_old / t_new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Writes a synthetic doxygen xml tree
+
+The generated tree mimics the output of doxygen with
+`INLINE_INHERITED_MEMB = YES`, i.e. every derived class carries copies of
+the members of its bases. The size of the tree is controlled by the number
+of classes, the inheritance depth, the number of members per class, the
+number of template specializations and the size of the code listings.
+"""
+import argparse
+import random
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+HEADER = ("<?xml version='1.0' encoding='UTF-8' standalone='no'?>\n"
+          '<doxygen xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+          'xsi:noNamespaceSchemaLocation="compound.xsd" version="1.9.8" xml:lang="en-US">\n')
+FOOTER = "</doxygen>\n"
+
+HIGHLIGHTS = ["keyword", "keywordtype", "normal", "comment", "stringliteral"]
+WORDS = ["matrix", "vector", "solver", "executor", "operator", "value", "index",
+         "stride", "norm", "residual", "preconditioner", "factory"]
+
+
+def doxygen_id(name: str) -> str:
+    return (name.replace("_", "__").replace("::", "_1_1").replace("<", "_3_01")
+            .replace(">", "_01_4").replace(" ", "").replace(",", "_00"))
+
+
+def attrs(**kwargs) -> str:
+    return "".join(f" {k.rstrip('_')}={quoteattr(str(v))}" for k, v in kwargs.items())
+
+
+class Generator(object):
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.out = Path(args.output)
+        self.memberdefs = dict()
+
+    def sentence(self, n=6):
+        return " ".join(self.rng.choice(WORDS) for _ in range(n))
+
+    def ref(self, target):
+        return f'<ref refid="{target["id"]}" kindref="compound">{escape(target["name"])}</ref>'
+
+    def programlisting(self, lines, filename=None):
+        out = [f"<programlisting{attrs(filename=filename) if filename else ''}>"]
+        if filename is None:
+            out.append("<codeline><highlight class=\"normal\">{.cpp}</highlight></codeline>")
+        for n in range(lines):
+            words = [self.rng.choice(WORDS) for _ in range(self.rng.randint(1, 4))]
+            cls = self.rng.choice(HIGHLIGHTS)
+            body = "<sp/>".join(escape(w) for w in words)
+            out.append(f'<codeline><highlight class="{cls}">{body};</highlight>'
+                       f'<highlight class="normal"><sp/>x&lt;{n}&gt;</highlight></codeline>')
+        out.append("</programlisting>")
+        return "\n".join(out)
+
+    def description(self, targets, tparams=(), params=(), returns=False, rich=False):
+        brief = f"<briefdescription>\n<para>{escape(self.sentence().capitalize())}. </para>\n    </briefdescription>\n"
+        paras = [f"<para>{escape(self.sentence(12))} <computeroutput>{escape(self.rng.choice(WORDS))}&lt;T&gt;"
+                 f"<ref refid=\"x\" kindref=\"member\">y</ref></computeroutput> {escape(self.sentence(4))}</para>"]
+        if targets:
+            target = self.rng.choice(targets)
+            paras.append(f"<para>See {self.ref(target)} and <bold>{escape(self.sentence(2))}</bold> or "
+                         f"<emphasis>{escape(self.sentence(2))}</emphasis>.</para>")
+        if rich:
+            paras.append("<para>Formula <formula id=\"0\">$f(x) = 6x$</formula> with "
+                         "<ulink url=\"https://example.org\">link</ulink><ndash/>text</para>")
+            items = "".join(f"<listitem><para>{escape(self.sentence(3))} </para>\n</listitem>"
+                            for _ in range(3))
+            paras.append(f"<para><itemizedlist>\n{items}</itemizedlist>\n</para>")
+            paras.append(f"<para>Example:</para>\n<para>{self.programlisting(self.args.listing_lines)}</para>")
+            paras.append(f"<para><simplesect kind=\"note\"><para>{escape(self.sentence())} </para>\n"
+                         f"</simplesect></para>")
+        items = []
+        for kind, names in (("templateparam", tparams), ("param", params)):
+            if not names:
+                continue
+            entries = "".join(
+                f"<parameteritem>\n<parameternamelist>\n<parametername>{n}</parametername>\n"
+                f"</parameternamelist>\n<parameterdescription>\n<para>{escape(self.sentence(3))} </para>\n"
+                f"</parameterdescription>\n</parameteritem>\n" for n in names)
+            items.append(f"<parameterlist kind=\"{kind}\">{entries}</parameterlist>")
+        if returns:
+            items.append(f"<simplesect kind=\"return\"><para>{escape(self.sentence(3))} </para>\n</simplesect>")
+        if items:
+            paras.append(f"<para>{''.join(items)}</para>")
+        detailed = "<detaileddescription>\n" + "\n".join(paras) + "\n    </detaileddescription>\n"
+        return brief + detailed
+
+    def plan(self):
+        args = self.args
+        namespaces = [dict(name=f"ns{n}", id=f"namespacens{n}", kind="namespace", classes=[])
+                      for n in range(max(1, args.namespaces))]
+        classes = []
+        for n in range(args.classes):
+            ns = namespaces[n % len(namespaces)]
+            kind = "struct" if n % 7 == 3 else "class"
+            name = f"{ns['name']}::Class{n}"
+            c = dict(name=name, id=f"{kind}{doxygen_id(name)}", kind=kind, ns=ns, bases=[], derived=[],
+                     inner=[], tparams=[], members=[])
+            if n // len(namespaces) % args.depth and ns["classes"]:
+                base = ns["classes"][-1]
+                c["bases"].append(base)
+                base["derived"].append(c)
+            classes.append(c)
+            ns["classes"].append(c)
+        for n, c in enumerate(list(classes)):
+            if args.inner and n % args.inner == 0:
+                name = f"{c['name']}::Inner"
+                inner = dict(name=name, id=f"struct{doxygen_id(name)}", kind="struct", ns=c["ns"], bases=[],
+                             derived=[], inner=[], tparams=[], members=[], outer=c)
+                c["inner"].append(inner)
+                classes.append(inner)
+        for n in range(args.specializations):
+            ns = namespaces[n % len(namespaces)]
+            name = f"{ns['name']}::Template{n}"
+            primary = dict(name=name, id=f"class{doxygen_id(name)}", kind="class", ns=ns, bases=[], derived=[],
+                           inner=[], tparams=["T", "U"], members=[])
+            classes.append(primary)
+            ns["classes"].append(primary)
+            for arg in ("int", "double"):
+                sname = f"{name}< T, {arg} >"
+                spec = dict(name=sname, id=f"class{doxygen_id(sname)}", kind="class", ns=ns, bases=[],
+                            derived=[], inner=[], tparams=["T"], members=[])
+                classes.append(spec)
+                ns["classes"].append(spec)
+        for c in classes:
+            for m in range(self.args.members):
+                kind = "function" if m % 4 else "variable"
+                prot = "public" if m % 5 != 4 else "protected"
+                mname = f"{self.rng.choice(WORDS)}_{m}"
+                c["members"].append(dict(id=f"{c['id']}_1a{self.rng.getrandbits(128):032x}", name=mname,
+                                         kind=kind, prot=prot, owner=c))
+        self.namespaces = namespaces
+        self.classes = classes
+
+    def all_members(self, c):
+        members = []
+        for base in c["bases"]:
+            members += self.all_members(base)
+        return members + c["members"]
+
+    def memberdef(self, m, targets):
+        # doxygen writes the same memberdef into every class inheriting it
+        if m["id"] not in self.memberdefs:
+            self.memberdefs[m["id"]] = self.new_memberdef(m, targets)
+        return self.memberdefs[m["id"]]
+
+    def new_memberdef(self, m, targets):
+        owner = m["owner"]
+        if m["kind"] == "function":
+            ret = self.ref(self.rng.choice(targets)) if targets and self.rng.random() < 0.3 else "void"
+            params = ["a", "b"][:self.rng.randint(0, 2)]
+            param_xml = "".join(f"\n        <param>\n          <type>const {self.ref(self.rng.choice(targets)) if targets else 'int'} &amp;</type>\n"
+                                f"          <declname>{p}</declname>\n        </param>" for p in params)
+            tparams = ""
+            if self.rng.random() < 0.2:
+                tparams = ("\n        <templateparamlist>\n          <param>\n            <type>typename T</type>\n"
+                           "          </param>\n        </templateparamlist>")
+            return (f'      <memberdef kind="function" id="{m["id"]}" prot="{m["prot"]}" static="no" const="no" '
+                    f'explicit="no" inline="yes" virt="non-virtual">{tparams}\n'
+                    f"        <type>{ret}</type>\n"
+                    f"        <definition>{ret if ret == 'void' else 'auto'} {escape(owner['name'])}::{m['name']}</definition>\n"
+                    f"        <argsstring>({', '.join('int ' + p for p in params)})</argsstring>\n"
+                    f"        <name>{m['name']}</name>\n"
+                    f"        <qualifiedname>{escape(owner['name'])}::{m['name']}</qualifiedname>{param_xml}\n"
+                    f"        {self.description(targets, params=params, returns=ret != 'void')}"
+                    f"        <inbodydescription>\n        </inbodydescription>\n"
+                    f'        <location file="include/ns.hpp" line="{self.rng.randint(1, 999)}" column="8"/>\n'
+                    f"      </memberdef>\n")
+        return (f'      <memberdef kind="variable" id="{m["id"]}" prot="{m["prot"]}" static="no" mutable="no">\n'
+                f"        <type>double</type>\n"
+                f"        <definition>double {escape(owner['name'])}::{m['name']}</definition>\n"
+                f"        <argsstring></argsstring>\n"
+                f"        <name>{m['name']}</name>\n"
+                f"        <initializer>= 1.0</initializer>\n"
+                f"        {self.description([])}"
+                f"        <inbodydescription>\n        </inbodydescription>\n"
+                f'        <location file="include/ns.hpp" line="{self.rng.randint(1, 999)}" column="8"/>\n'
+                f"      </memberdef>\n")
+
+    def write(self, refid, body):
+        (self.out / f"{refid}.xml").write_text(HEADER + body + FOOTER)
+
+    def write_class(self, c):
+        targets = [t for t in self.rng.sample(self.classes, min(len(self.classes), 4)) if t is not c][:3]
+        out = [f'  <compounddef id="{c["id"]}" kind="{c["kind"]}" language="C++" prot="public">\n'
+               f"    <compoundname>{escape(c['name'])}</compoundname>\n"]
+        for b in c["bases"]:
+            out.append(f'    <basecompoundref refid="{b["id"]}" prot="public" virt="non-virtual">'
+                       f"{escape(b['name'])}</basecompoundref>\n")
+        if not c["bases"] and self.rng.random() < 0.1:
+            out.append('    <basecompoundref prot="public" virt="non-virtual">std::true_type</basecompoundref>\n')
+        for d in c["derived"]:
+            out.append(f'    <derivedcompoundref refid="{d["id"]}" prot="public" virt="non-virtual">'
+                       f"{escape(d['name'])}</derivedcompoundref>\n")
+        out.append('    <includes local="no">include/ns.hpp</includes>\n')
+        for ic in c["inner"]:
+            out.append(f'    <innerclass refid="{ic["id"]}" prot="public">{escape(ic["name"])}</innerclass>\n')
+        if c["tparams"]:
+            out.append("    <templateparamlist>\n" + "".join(
+                f"      <param>\n        <type>typename</type>\n        <declname>{t}</declname>\n"
+                f"        <defname>{t}</defname>\n      </param>\n" for t in c["tparams"]) + "    </templateparamlist>\n")
+        members = self.all_members(c)
+        for kind, prot in (("func", "public"), ("attrib", "public"), ("func", "protected")):
+            selected = [m for m in members if m["prot"] == prot and (m["kind"] == "function") == (kind == "func")]
+            if selected:
+                out.append(f'      <sectiondef kind="{prot}-{kind}">\n')
+                out += [self.memberdef(m, targets) for m in selected]
+                out.append("      </sectiondef>\n")
+        out.append("    " + self.description(targets, tparams=c["tparams"], rich=True))
+        if c["bases"] or c["derived"]:
+            out.append(f'    <inheritancegraph>\n      <node id="1">\n        <label>{escape(c["name"])}</label>\n'
+                       f'        <link refid="{c["id"]}"/>\n      </node>\n    </inheritancegraph>\n')
+            out.append(f'    <collaborationgraph>\n      <node id="1">\n        <label>{escape(c["name"])}</label>\n'
+                       f'        <link refid="{c["id"]}"/>\n      </node>\n    </collaborationgraph>\n')
+        out.append('    <location file="include/ns.hpp" line="12" column="1" bodyfile="include/ns.hpp" '
+                   'bodystart="12" bodyend="40"/>\n    <listofallmembers>\n')
+        for m in members:
+            out.append(f'      <member refid="{m["id"]}" prot="{m["prot"]}" virt="non-virtual">'
+                       f"<scope>{escape(c['name'])}</scope><name>{m['name']}</name></member>\n")
+        out.append("    </listofallmembers>\n  </compounddef>\n")
+        self.write(c["id"], "".join(out))
+
+    def write_namespace(self, ns):
+        out = [f'  <compounddef id="{ns["id"]}" kind="namespace" language="C++">\n'
+               f"    <compoundname>{ns['name']}</compoundname>\n"]
+        for c in ns["classes"]:
+            out.append(f'    <innerclass refid="{c["id"]}" prot="public">{escape(c["name"])}</innerclass>\n')
+        out.append("    " + self.description([]))
+        out.append('    <location file="include/ns.hpp" line="1" column="1"/>\n  </compounddef>\n')
+        self.write(ns["id"], "".join(out))
+
+    def write_file(self):
+        fid = "ns_8hpp"
+        funcs = [dict(id=f"{fid}_1a{self.rng.getrandbits(128):032x}", name=f"free_{n}", kind="function",
+                      prot="public", owner=dict(name="", id=fid)) for n in range(self.args.members)]
+        out = [f'  <compounddef id="{fid}" kind="file" language="C++">\n    <compoundname>ns.hpp</compoundname>\n'
+               f'    <incdepgraph>\n      <node id="1">\n        <label>ns.hpp</label>\n      </node>\n'
+               f"    </incdepgraph>\n"]
+        for c in self.classes:
+            out.append(f'    <innerclass refid="{c["id"]}" prot="public">{escape(c["name"])}</innerclass>\n')
+        for ns in self.namespaces:
+            out.append(f'    <innernamespace refid="{ns["id"]}">{ns["name"]}</innernamespace>\n')
+        out.append('      <sectiondef kind="func">\n')
+        out += [self.memberdef(m, self.classes[:3]) for m in funcs]
+        out.append("      </sectiondef>\n")
+        out.append('      <sectiondef kind="define">\n'
+                   f'      <memberdef kind="define" id="{fid}_1a{0:032x}" prot="public" static="no">\n'
+                   f"        <name>TOP_LEVEL_MACRO</name>\n"
+                   f"        {self.description([])}"
+                   f"        <inbodydescription>\n        </inbodydescription>\n"
+                   f'        <location file="include/ns.hpp" line="3" column="9"/>\n'
+                   f"      </memberdef>\n      </sectiondef>\n")
+        out.append("    " + self.description([]))
+        out.append(self.programlisting(self.args.listing_lines, filename=".hpp") + "\n")
+        out.append('    <location file="include/ns.hpp"/>\n  </compounddef>\n')
+        self.write(fid, "".join(out))
+        return dict(id=fid, name="ns.hpp", kind="file", members=funcs)
+
+    def write_index(self, compounds):
+        out = ["<?xml version='1.0' encoding='UTF-8' standalone='no'?>\n"
+               '<doxygenindex xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+               'xsi:noNamespaceSchemaLocation="index.xsd" version="1.9.8" xml:lang="en-US">\n']
+        for c in compounds:
+            out.append(f'  <compound refid="{c["id"]}" kind="{c["kind"]}"><name>{escape(c["name"])}</name>\n')
+            for m in c.get("members", []):
+                out.append(f'    <member refid="{m["id"]}" kind="{m["kind"]}"><name>{m["name"]}</name></member>\n')
+            out.append("  </compound>\n")
+        out.append('  <compound refid="dir_0" kind="dir"><name>include</name>\n  </compound>\n')
+        out.append("</doxygenindex>\n")
+        (self.out / "index.xml").write_text("".join(out))
+
+    def run(self):
+        self.out.mkdir(parents=True, exist_ok=True)
+        self.plan()
+        for c in self.classes:
+            self.write_class(c)
+        for ns in self.namespaces:
+            self.write_namespace(ns)
+        file = self.write_file()
+        self.write_index(self.classes + self.namespaces + [file])
+
+
+def add_arguments(parser):
+    """Options controlling the shape of the generated tree, except its size"""
+    parser.add_argument('--namespaces', type=int, default=4, help="Number of namespaces")
+    parser.add_argument('--depth', type=int, default=4, help="Length of the inheritance chains")
+    parser.add_argument('--members', type=int, default=8, help="Members declared per class")
+    parser.add_argument('--specializations', type=int, default=4,
+                        help="Number of class templates with two partial specializations each")
+    parser.add_argument('--inner', type=int, default=5, help="Every n-th class gets an inner class (0 for none)")
+    parser.add_argument('--listing-lines', type=int, default=10, help="Lines per code listing")
+    parser.add_argument('--seed', type=int, default=1337, help="Random seed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', required=True, help="Output directory for the xml files")
+    parser.add_argument('-n', '--classes', type=int, default=100, help="Number of plain classes")
+    add_arguments(parser)
+    Generator(parser.parse_args()).run()
+
+
+if __name__ == "__main__":
+    main()
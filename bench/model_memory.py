@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Memory of the converted compounds as dicts and in the compact model
+
+Loads a JSON map written by dispatch.py and compares the traced memory of
+its classes and namespaces as plain dicts against `model.compact`. The
+compact model has to export the same dicts, including the key order.
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import model
+
+SCOPES = ["classes", "namespaces"]
+
+
+def traced(f, *args):
+    """Result of `f` with the traced memory held by it and the time it took"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = f(*args)
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, seconds
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return {scope: data[scope] for scope in SCOPES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('map', help="JSON map written by dispatch.py")
+    parser.add_argument('--no-check', action="store_true", help="Skip comparing the exported dicts")
+    args = parser.parse_args()
+
+    data, dict_size, load_time = traced(load, args.map)
+    reference = None if args.no_check else load(args.map)
+    compact, compact_size, pack_time = traced(model.compact, data)
+    del data
+
+    if reference is not None:
+        for scope in SCOPES:
+            for key, value in reference[scope].items():
+                exported = compact[scope][key]
+                if exported != value or json.dumps(exported) != json.dumps(value):
+                    raise RuntimeError(f"{scope}/{key} differs after packing")
+
+    print(f"{'compounds':>10}{'dicts':>12}{'compact':>12}{'ratio':>8}{'load':>10}{'pack':>10}")
+    print(f"{sum(len(compact[scope]) for scope in SCOPES):>10}{dict_size / 2 ** 20:>9.1f} MB"
+          f"{compact_size / 2 ** 20:>9.1f} MB{dict_size / compact_size:>7.1f}x{load_time:>9.2f}s{pack_time:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
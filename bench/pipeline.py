@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmark of the pipeline phases on synthetic doxygen xml trees
+
+For each size a tree is written by generate_xml.py, which is then
+converted by dispatch.py and rendered by make_rst.py. The phases are
+timed separately:
+
+- dispatch: converting the compounds with `dispatch_index`, without
+  the inheritance pass
+- inheritance: `add_inheritance_section`
+- relations: the relationship passes of make_rst, i.e. building the
+  class index and relating the classes
+- stringify: preparing the template variables of all classes
+- render: rendering the class pages from the prepared variables
+
+The results are written as JSON, and can be compared against the results
+of another commit with `--baseline`.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import xml.dom.minidom as MD
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root / "src"))
+
+import dispatch as D
+import generate_xml
+import make_rst as M
+
+PHASES = ["dispatch", "inheritance", "relations", "stringify", "render"]
+
+
+class Timer(object):
+    def __init__(self):
+        self.phases = dict()
+
+    def __call__(self, phase, f, *args):
+        start = time.perf_counter()
+        result = f(*args)
+        self.phases[phase] = time.perf_counter() - start
+        return result
+
+
+def run(xml_dir: Path, args) -> dict:
+    timer = Timer()
+    ctx = D.Context(directory=str(xml_dir), backend=args.backend, jobs=args.jobs)
+    dom = MD.parse(str(xml_dir / "index.xml"))
+
+    add_inheritance_section = D.add_inheritance_section
+    D.add_inheritance_section = lambda data: None
+    try:
+        data = timer("dispatch", D.dispatch_index, dom, ctx)
+    finally:
+        D.add_inheritance_section = add_inheritance_section
+    timer("inheritance", D.add_inheritance_section, data)
+
+    def relations():
+        class_index = M.read_class_index(data["classes"])
+        return class_index, M.relate_classes(class_index)
+
+    class_index, relations = timer("relations", relations)
+    class_names = {id: c["name"] for id, c in class_index.items()}
+
+    renderer = M.ClassRenderer(root / "src" / "wip", data["classes"], class_names)
+    variables = timer("stringify", lambda: [renderer.prepare(key, relations[key]) for key in class_index])
+    timer("render", lambda: [renderer.template.render(v) for v in variables])
+
+    return dict(classes=len(class_index), compounds=len(class_index) + len(data["namespaces"]) + 1,
+                phases=timer.phases)
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs="*", default=[100, 1000, 10000],
+                        help="Numbers of plain classes of the generated trees")
+    parser.add_argument('-b', '--backend', choices=D.backends.keys(), default="minidom")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="Processes used by dispatch_index")
+    parser.add_argument('-o', '--output', help="File to write the JSON results to, defaults to stdout")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    generate_xml.add_arguments(parser)
+    args = parser.parse_args()
+
+    results = dict(commit=commit(), python=platform.python_version(), backend=args.backend, jobs=args.jobs,
+                   runs=[])
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            xml_dir = Path(tmp) / str(size)
+            generate_xml.Generator(argparse.Namespace(**vars(args) | dict(classes=size, output=xml_dir))).run()
+            results["runs"].append(dict(size=size) | run(xml_dir, args))
+
+    baseline = dict()
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r["size"]: r["phases"] for r in json.load(f)["runs"]}
+
+    print(f"{'size':>8}" + "".join(f"{phase:>13}" for phase in PHASES), file=sys.stderr)
+    for r in results["runs"]:
+        print(f"{r['size']:>8}" + "".join(f"{r['phases'][phase]:>12.3f}s" for phase in PHASES), file=sys.stderr)
+        if r["size"] in baseline:
+            print(f"{'speedup':>8}" + "".join(f"{baseline[r['size']][phase] / r['phases'][phase]:>12.2f}x"
+                                              for phase in PHASES), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
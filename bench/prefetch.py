@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark of prefetching the compound files on a slow file system
+
+Converts a synthetic doxygen xml tree, written by generate_xml.py, with
+`dispatch_compounds` in one process. A slow file system is simulated by
+delaying every read of a compound file by the given latency. For each
+latency and prefetch depth, the wall time and the time the conversion
+waited for reads are reported. All runs have to produce the same
+compounds.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import dispatch as D
+import generate_xml
+
+
+def delayed_read(read, latency):
+    def read_compound(file):
+        time.sleep(latency)
+        return read(file)
+
+    return read_compound
+
+
+def run(files, ctx):
+    stats = D.ReadStats()
+    start = time.perf_counter()
+    result = [data for data, _ in D.dispatch_compounds(files, ctx, stats)]
+    return time.perf_counter() - start, stats, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=200, help="Number of plain classes of the generated tree")
+    parser.add_argument('--latency', type=float, nargs="*", default=[0, 0.002, 0.01],
+                        help="Simulated latencies of a read in seconds")
+    parser.add_argument('--prefetch', type=int, nargs="*", default=[0, 2, 8, 32],
+                        help="Prefetch depths, 0 reads synchronously")
+    parser.add_argument('--prefetch-mb', type=int, default=64, help="Byte budget of the prefetched files")
+    parser.add_argument('-b', '--backend', choices=D.backends.keys(), default="minidom")
+    generate_xml.add_arguments(parser)
+    args = parser.parse_args()
+
+    read_compound = D.read_compound
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_dir = Path(tmp)
+        generate_xml.Generator(argparse.Namespace(**vars(args) | dict(classes=args.size, output=xml_dir))).run()
+        files = sorted(str(f) for f in xml_dir.glob("*.xml") if f.name != "index.xml")
+
+        reference = None
+        print(f"{'latency':>8}{'depth':>7}{'wall':>10}{'io wait':>10}{'convert':>10}")
+        for latency in args.latency:
+            D.read_compound = delayed_read(read_compound, latency)
+            try:
+                for depth in args.prefetch:
+                    ctx = D.Context(directory=str(xml_dir), backend=args.backend, prefetch=depth,
+                                    prefetch_bytes=args.prefetch_mb * 2 ** 20)
+                    wall, stats, result = run(files, ctx)
+                    if reference is None:
+                        reference = result
+                    elif result != reference:
+                        raise RuntimeError(f"Compounds differ with latency {latency} and depth {depth}")
+                    print(f"{latency * 1000:>6.0f}ms{depth:>7}{wall:>9.2f}s{stats.wait:>9.2f}s{stats.convert:>9.2f}s")
+            finally:
+                D.read_compound = read_compound
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Benchmark of the class relationship passes in make_rst.py
+
+Compares `relate_classes` against the former nested scans over all
+classes on synthetic class indices. Both variants have to produce the
+same relations.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import make_rst as M
+
+
+def reference_relate_classes(class_index: dict) -> dict:
+    def get_class_id_by_name(name, classes):
+        for key, data in classes.items():
+            if data['name'] == name:
+                return key
+        raise KeyError(name)
+
+    relations = {key: {"specializations": {}} for key in class_index}
+
+    all_inner_classes = set()
+
+    for key, data in class_index.items():
+        for ic in data["innerclass"]:
+            relations[ic]["is_inner"] = True
+            all_inner_classes.add(ic)
+
+    for key, data in class_index.items():
+        rel = relations[key]
+        rel['is_special'] = M.is_class_name_specialization(data["name"]) and key not in all_inner_classes
+        if rel['is_special']:
+            stripped_name = M.strip_class_name_specialization(data["name"])
+            rel['specialization_of'] = get_class_id_by_name(stripped_name, class_index)
+
+    for key, data in class_index.items():
+        for inner_key, inner_data in class_index.items():
+            inner_rel = relations[inner_key]
+            if inner_rel['is_special']:
+                if key == inner_rel['specialization_of'] and key != inner_data['name']:
+                    relations[key]['specializations'][inner_key] = {'name': inner_data['name']}
+
+    return relations
+
+
+def synthetic_class_index(n: int) -> dict:
+    """Class index with `n` classes
+
+    Every tenth class is a template with two specializations and every
+    fifth class has an inner class, which itself looks like a
+    specialization to test the inner class exclusion.
+    """
+    index = dict()
+    i = 0
+    while len(index) < n:
+        name = f"gko::ns{i % 17}::Class{i}"
+        key = f"classgko_1_1ns{i % 17}_1_1Class{i}"
+        index[key] = {"name": name, "innerclass": []}
+        if i % 10 == 0:
+            for arg in ["float", "double"]:
+                index[f"{key}_3_01{arg}_01_4"] = {"name": f"{name}< {arg} >", "innerclass": []}
+        if i % 5 == 0:
+            inner = f"{key}_1_1inner"
+            index[key]["innerclass"].append(inner)
+            index[inner] = {"name": f"{name}::inner< int >", "innerclass": []}
+        i += 1
+    return index
+
+
+def best_of(f, arg, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = f(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--classes', type=int, nargs="*", default=[1000, 10000],
+                        help="Sizes of the synthetic class indices")
+    parser.add_argument('-r', '--repeat', type=int, default=1, help="Best of this many runs is reported")
+    args = parser.parse_args()
+
+    print(f"{'classes':>10}{'nested scans':>15}{'name index':>15}{'speedup':>10}")
+    for n in args.classes:
+        class_index = synthetic_class_index(n)
+        t_old, r_old = best_of(reference_relate_classes, class_index, args.repeat)
+        t_new, r_new = best_of(M.relate_classes, class_index, args.repeat)
+        if r_old != r_new:
+            raise RuntimeError(f"Relations differ for {n} classes")
+        print(f"{len(class_index):>10}{t_old:>14.3f}s{t_new:>14.3f}s{t_old / t_new:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
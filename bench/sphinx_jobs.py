@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Benchmark of serial and parallel sphinx builds of the example project
+
+Builds a copy of the example project, whose API pages are rendered by the
+sphinx_api extension, once with `-j 1` and once for each given number of
+processes. Every build starts without a doctree, so all pages are read
+and written. The generated API pages have to be identical.
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+
+
+def build(source: Path, out_dir: Path, jobs: int, env: dict) -> float:
+    shutil.rmtree(out_dir, ignore_errors=True)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "sphinx", "-q", "-b", "html", "-j", str(jobs), str(source), str(out_dir)],
+                   env=env, check=True, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def same_pages(a: Path, b: Path) -> bool:
+    cmp = filecmp.dircmp(a, b)
+    return not (cmp.left_only or cmp.right_only or cmp.diff_files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-d', '--doxygen', required=True,
+                        help="Path to the doxygen generated xml directory of the example")
+    parser.add_argument('-j', '--jobs', type=int, nargs="*", default=[os.cpu_count()],
+                        help="Numbers of processes to compare against -j 1")
+    parser.add_argument('-r', '--repeat', type=int, default=1, help="Best of this many runs is reported")
+    args = parser.parse_args()
+
+    env = os.environ | {"MASP_BIN": str(root / "src"), "MASP_TMPL": str(root / "src" / "wip"),
+                        "MASP_XML": str(Path(args.doxygen).resolve())}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        shutil.copytree(root / "example" / "source", tmp / "source")
+
+        times = dict()
+        for jobs in [1] + args.jobs:
+            times[jobs] = min(build(tmp / "source", tmp / f"build-j{jobs}", jobs, env) for _ in range(args.repeat))
+            if not same_pages(tmp / "build-j1" / "cpp_api", tmp / f"build-j{jobs}" / "cpp_api"):
+                raise RuntimeError(f"Pages differ for -j {jobs}")
+
+    print(f"{'jobs':>6}{'build':>10}{'speedup':>10}")
+    for jobs, t in times.items():
+        print(f"{jobs:>6}{t:>9.2f}s{times[1] / t:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,11 @@
 #
 # For the full list of built-in configuration values, see the documentation:
 # https://www.sphinx-doc.org/en/master/usage/configuration.html
+import hashlib
 import os
 import subprocess
+import time
+from fnmatch import fnmatch
 from pathlib import Path
 
 # -- Project information -----------------------------------------------------
@@ -36,6 +39,8 @@ html_static_path = ['_static']
 ginkgo_root = Path('..').resolve()
 ginkgo_include = Path('../../src').resolve()
 doxygen_dir = Path('doxygen').resolve()
+doxygen_file_patterns = ["*.cpp", "*.cu", "*.hpp", "*.cuh", "*.md"]
+doxygen_exclude_patterns = ["*/test/*"]
 
 doxyfile = f"""
 QUIET                  = YES
@@ -55,13 +60,13 @@ OUTPUT_DIRECTORY       = {doxygen_dir}
 EXAMPLE_PATH           = 
 RECURSIVE              = YES
 EXAMPLE_RECURSIVE      = NO
-FILE_PATTERNS          = *.cpp *.cu *.hpp *.cuh *.md
+FILE_PATTERNS          = {" ".join(doxygen_file_patterns)}
 EXAMPLE_PATTERNS       = *.cpp *.hpp *.cuh *.cu
 EXTENSION_MAPPING      = cu=c++ cuh=c++
 FULL_PATH_NAMES        = YES
 STRIP_FROM_PATH        = {ginkgo_include}
 STRIP_FROM_INC_PATH    = {ginkgo_include}
-EXCLUDE_PATTERNS       = */test/*
+EXCLUDE_PATTERNS       = {" ".join(doxygen_exclude_patterns)}
 USE_MDFILE_AS_MAINPAGE = 
 
 # Parsing options
@@ -140,7 +145,36 @@ WARN_LOGFILE           =
 """
 
 
-subprocess.run(['doxygen', '-'], input=doxyfile, universal_newlines=True)
+def doxygen_inputs(root, patterns, exclude_patterns):
+    """All files doxygen reads from the INPUT directory `root`"""
+    for path in sorted(Path(root).rglob("*")):
+        if (path.is_file() and any(fnmatch(path.name, p) for p in patterns)
+                and not any(fnmatch(str(path), p) for p in exclude_patterns)):
+            yield path
+
+
+def doxygen_stamp(doxyfile, inputs):
+    """Hash of the doxygen configuration and the path, size and mtime of its inputs"""
+    stamp = hashlib.sha256(doxyfile.encode())
+    for path in inputs:
+        stat = path.stat()
+        stamp.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return stamp.hexdigest()
+
+
+# Doxygen only runs if the configuration or any input changed since the
+# last successful run, which is recorded in the stamp file
+stamp_file = doxygen_dir / ".doxygen_stamp"
+stamp = doxygen_stamp(doxyfile, doxygen_inputs(ginkgo_include, doxygen_file_patterns, doxygen_exclude_patterns))
+if (stamp_file.is_file() and stamp_file.read_text() == stamp
+        and (doxygen_dir / "xml" / "index.xml").is_file()):
+    print("doxygen: inputs unchanged, skipping")
+else:
+    start = time.perf_counter()
+    result = subprocess.run(['doxygen', '-'], input=doxyfile, universal_newlines=True)
+    print(f"doxygen: finished in {time.perf_counter() - start:.1f}s")
+    if result.returncode == 0:
+        stamp_file.write_text(stamp)
 xml_dir = f"{doxygen_dir}/xml"
 
 # -- Options for breathe
@@ -2,6 +2,12 @@
 #
 # For the full list of built-in configuration values, see the documentation:
 # https://www.sphinx-doc.org/en/master/usage/configuration.html
+import os
+import sys
+
+# The API extension and the scripts it uses, either from the source tree
+# or from the installed masp package
+sys.path.insert(0, os.environ.get("MASP_BIN", os.path.abspath("../../src")))
 
 # -- Project information -----------------------------------------------------
 # https://www.sphinx-doc.org/en/master/usage/configuration.html#project-information
@@ -15,12 +21,21 @@ release = '2023'
 # https://www.sphinx-doc.org/en/master/usage/configuration.html#general-configuration
 
 extensions = [
-    'sphinx_rtd_theme'        
+    'sphinx_rtd_theme',
+    'sphinx_api'
 ]
 
 templates_path = ['_templates']
 exclude_patterns = []
 
+# -- Options for the API pages
+
+api_doxygen = os.environ.get("MASP_XML", "../doxygen/xml")
+# A variable map written by dispatch.py is used instead of the xml, if given
+api_map = os.environ.get("MASP_MAP")
+api_templates = os.environ.get("MASP_TMPL", "../../src/wip")
+api_dir = "cpp_api"
+api_title = "C++"
 
 
 # -- Options for HTML output -------------------------------------------------
@@ -1,25 +1,35 @@
-from collections import defaultdict
+from collections import defaultdict, deque
 
 import argparse
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from enum import Enum, auto
-from functools import singledispatch, reduce
+from functools import singledispatch, reduce, cache
+import hashlib
+import io
+import os
+import struct
+import sys
+import time
+from itertools import repeat
 import xml.dom.minidom as MD
+import xml.etree.ElementTree as ET
 from pathlib import Path
 import json
 from typing import Any
 
+import model
+import profiling
+
 gko_directory = "../../ginkgo/document-create-functions/doc/doxygen/xml"
 simple_directory = "doxygen/xml"
 
-enum_types = set()
-
 
 class UniqueEnumType(Enum):
+    """Enum whose values are distinct types, to dispatch on them"""
+
     def _generate_next_value_(name: str, start: int, count: int, last_values: list[Any]) -> Any:
-        new_type = type(name, (object,), dict())
-        enum_types.add(new_type)
-        return new_type
+        return type(name, (object,), dict())
 
 
 class xml_tag(UniqueEnumType):
@@ -63,6 +73,25 @@ FORCE_LIST = {
     "parameteritem"
 }
 
+KEEP_SUBTREE = {
+    "computeroutput"
+}
+
+
+@dataclass
+class Element(object):
+    """Parser independent view of an xml element
+
+    The children are already dispatched, i.e. they hold the converted data
+    of the child nodes in document order. The parser node is kept as
+    `source` for the tags which need the raw text of their subtree, see
+    `KEEP_SUBTREE`.
+    """
+    tag: str
+    attributes: dict[str, str]
+    children: list
+    source: Any
+
 
 def as_list(v):
     if isinstance(v, list):
@@ -81,25 +110,60 @@ def dispatch_tag(tag, expr, ctx):
     raise AssertionError(f"Unhandled tag {tag}")
 
 
+@singledispatch
+def inner_text(node) -> str:
+    raise AssertionError(f"Unhandled type {type(node)}")
+
+
+@inner_text.register
+def inner_text_(node: MD.Element) -> str:
+    def get_text_node(node):
+        text_nodes = []
+        for c in node.childNodes:
+            if isinstance(c, MD.Text):
+                text_nodes.append(c)
+            else:
+                text_nodes += get_text_node(c)
+        return text_nodes
+    return "".join([t.data for t in get_text_node(node)])
+
+
+@inner_text.register
+def inner_text_(node: ET.Element) -> str:
+    return "".join(node.itertext())
+
+
 @dispatch.register
 def dispatch_(expr: MD.Document, ctx):
     return dispatch(expr.getElementsByTagName("doxygen")[0], ctx)
 
 
-def dispatch_default(expr: MD.Element, ctx):
-    def merge(a: dict, b: dict):
-        common_keys = set(a.keys()) & set(b.keys())
-        unique_kwargs = [(k, a[k]) for k in set(a.keys()) - common_keys] + [(k, b[k]) for k in
-                                                                            set(b.keys()) - common_keys]
-        shared_kwargs = [(k, as_list(a[k]) + as_list(b[k])) for k in common_keys]
-        merged = dict(unique_kwargs + shared_kwargs)
-        if "#text" in merged:
-            merged["#text"] = "".join(merged["#text"])
-        return merged
+def dispatch_default(expr: Element, ctx):
+    """Merge the attributes and the converted children into a single dict.
 
-    tag = expr.tagName
-    attribs = {f"@{k}": v for k, v in expr.attributes.items()}
-    data = {tag: reduce(lambda r, c: merge(r, dispatch(c, ctx)), expr.childNodes, attribs)}
+    Values of keys which occur more than once are concatenated into a
+    list, except for `#text` whose parts are joined into one string.
+    Repeated values are collected first and combined once, which keeps
+    this linear in the number of children.
+    """
+    tag = expr.tag
+    merged = {f"@{k}": v for k, v in expr.attributes.items()}
+    repeated = dict()
+    for child in expr.children:
+        for k, v in child.items():
+            if k not in merged:
+                merged[k] = v
+            elif k in repeated:
+                repeated[k].append(v)
+            else:
+                repeated[k] = [merged[k], v]
+
+    for k, values in repeated.items():
+        if k == "#text":
+            merged[k] = "".join(values)
+        else:
+            merged[k] = [x for v in values for x in as_list(v)]
+    data = {tag: merged}
 
     if tag in NO_TEXT:
         if "#text" in data[tag]:
@@ -112,14 +176,32 @@ def dispatch_default(expr: MD.Element, ctx):
 
 @dispatch.register
 def dispatch_(expr: MD.Element, ctx):
-    try:
-        tag = xml_tag[expr.tagName.upper()].value()
-    except KeyError:
-        data = dispatch_default(expr, ctx)
-    else:
-        data = dispatch_tag(tag, expr, ctx)
+    children = [dispatch(c, ctx) for c in expr.childNodes]
+    return dispatch_element(Element(expr.tagName, dict(expr.attributes.items()), children, expr), ctx)
 
-    return data
+
+@dispatch.register
+def dispatch_element(expr: Element, ctx):
+    """Convert an element whose children are already converted
+
+    With a profiler the conversions of each tag and their time are
+    counted. The processes of a pool get no profiler, so only the
+    conversions in this process are counted, i.e. with one job.
+    """
+    if ctx.profiler:
+        start = time.perf_counter()
+        try:
+            return convert_element(expr, ctx)
+        finally:
+            ctx.profiler.add("tags", expr.tag, time.perf_counter() - start)
+    return convert_element(expr, ctx)
+
+
+def convert_element(expr: Element, ctx):
+    if handler := tag_dispatch.get(expr.tag):
+        impl, tag = handler
+        return impl(tag, expr, ctx)
+    return dispatch_default(expr, ctx)
 
 
 @dispatch.register
@@ -128,25 +210,25 @@ def dispatch_(expr: MD.Text, ctx):
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.BLOCKQUOTE.value, expr: MD.Element, ctx):
+def dispatch_tag_(tag: xml_tag.BLOCKQUOTE.value, expr: Element, ctx):
     data = dispatch_default(expr, ctx)
     return data
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.SP.value, expr: MD.Element, ctx):
+def dispatch_tag_(tag: xml_tag.SP.value, expr: Element, ctx):
     return {"#text": " "}
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.PARA.value, expr: MD.Element, ctx):
-    return {"para": [[dispatch(c, ctx) for c in expr.childNodes]]}
+def dispatch_tag_(tag: xml_tag.PARA.value, expr: Element, ctx):
+    return {"para": [expr.children]}
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.COMPOUNDDEF.value, expr: MD.Element,
+def dispatch_tag_(tag: xml_tag.COMPOUNDDEF.value, expr: Element,
                   ctx):
-    data = dispatch_default(expr, ctx)[expr.tagName]
+    data = dispatch_default(expr, ctx)[expr.tag]
     data["name"] = data["compoundname"]["#text"]
     sections = as_list(data.get("sectiondef", [dict()]))
     data["sectiondef"] = reduce(lambda r, d: r | d, sections, dict())
@@ -155,25 +237,17 @@ def dispatch_tag_(tag: xml_tag.COMPOUNDDEF.value, expr: MD.Element,
     for key in ["inheritancegraph", "collaborationgraph", "compoundname"]:
         if key in data:
             del data[key]
-    return {expr.tagName: data}
+    return {expr.tag: data}
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.COMPUTEROUTPUT.value, expr: MD.Element, ctx):
-    def get_text_node(node):
-        text_nodes = []
-        for c in node.childNodes:
-            if isinstance(c, MD.Text):
-                text_nodes.append(c)
-            else:
-                text_nodes += get_text_node(c)
-        return text_nodes
-    data = {expr.tagName: {"#text": "".join([t.data for t in get_text_node(expr)]).replace("\\<", "<").replace("\\>", ">")}}
+def dispatch_tag_(tag: xml_tag.COMPUTEROUTPUT.value, expr: Element, ctx):
+    data = {expr.tag: {"#text": inner_text(expr.source).replace("\\<", "<").replace("\\>", ">")}}
     return data
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.SECTIONDEF.value, expr: MD.Element, ctx):
+def dispatch_tag_(tag: xml_tag.SECTIONDEF.value, expr: Element, ctx):
     data = dispatch_default(expr, ctx)
     section_data = defaultdict(dict)
     for sec in as_list(data["sectiondef"]):
@@ -186,41 +260,40 @@ def dispatch_tag_(tag: xml_tag.SECTIONDEF.value, expr: MD.Element, ctx):
 @dispatch_tag.register
 def dispatch_tag_(
         tag: xml_tag.DETAILEDDESCRIPTION.value | xml_tag.BRIEFDESCRIPTION.value | xml_tag.PARAMETERDESCRIPTION.value,
-        expr: MD.Element, ctx):
+        expr: Element, ctx):
     data = dispatch_default(expr, ctx)
-    return {expr.tagName: {"para": data[expr.tagName].get("para", [[]])}}
+    return {expr.tag: {"para": data[expr.tag].get("para", [[]])}}
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.TYPE.value, expr: MD.Element, ctx):
-    if children := expr.childNodes:
-        return {"type": dispatch(child, ctx) for child in children}
+def dispatch_tag_(tag: xml_tag.TYPE.value, expr: Element, ctx):
+    if children := expr.children:
+        return {"type": children[-1]}
     else:
         return {"type": {"#text": "void"}}
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.HIGHLIGHT.value, expr: MD.Element, ctx):
+def dispatch_tag_(tag: xml_tag.HIGHLIGHT.value, expr: Element, ctx):
     data = dispatch_default(expr, ctx)
-    return {k: v for k, v in data[expr.tagName].items() if k != "@class"}
+    return {k: v for k, v in data[expr.tag].items() if k != "@class"}
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.NAME.value, expr: MD.Element, ctx):
-    return {expr.tagName: expr.childNodes[0].data}
+def dispatch_tag_(tag: xml_tag.NAME.value, expr: Element, ctx):
+    return {expr.tag: expr.children[0]["#text"]}
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.INNERCLASS.value, expr: MD.Element, ctx):
-    return {expr.tagName: expr.attributes["refid"].value}
+def dispatch_tag_(tag: xml_tag.INNERCLASS.value, expr: Element, ctx):
+    return {expr.tag: expr.attributes["refid"]}
 
 
 @dispatch_tag.register
-def dispatch_tag_(tag: xml_tag.PROGRAMLISTING.value, expr: MD.Element, ctx):
-    codelines = [dispatch_default(c, ctx) for c in expr.childNodes if
-                 isinstance(c, MD.Element) and c.tagName == "codeline"]
+def dispatch_tag_(tag: xml_tag.PROGRAMLISTING.value, expr: Element, ctx):
+    codelines = [c for c in expr.children if "codeline" in c]
     if "filename" in expr.attributes:
-        style = expr.attributes["filename"].value.lstrip(".")
+        style = expr.attributes["filename"].lstrip(".")
     else:
         try:
             first_line = codelines[0]["codeline"]["#text"]
@@ -231,40 +304,320 @@ def dispatch_tag_(tag: xml_tag.PROGRAMLISTING.value, expr: MD.Element, ctx):
                 raise
         except:
             style = "text"
-    return {expr.tagName: {"style": style, "para": [codelines]}}
+    return {expr.tag: {"style": style, "para": [codelines]}}
+
+
+def build_tag_dispatch():
+    """Map the xml tag names in `xml_tag` to their `dispatch_tag` implementation.
+
+    The implementations and tag objects are resolved once here, instead of
+    for every element. This has to be rebuilt if tags are added to `xml_tag`
+    later on.
+    """
+    return {tag.name.lower(): (dispatch_tag.dispatch(tag.value), tag.value()) for tag in xml_tag}
+
+
+tag_dispatch = build_tag_dispatch()
+
+
+def parse_minidom(source, ctx):
+    return dispatch(MD.parse(source), ctx)
+
+
+XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+
+
+def prefixed_name(name: str, prefixes: dict) -> str:
+    """Turn ElementTree's `{uri}name` back into `prefix:name`"""
+    if not name.startswith("{"):
+        return name
+    uri, _, local = name[1:].partition("}")
+    return f"{prefixes[uri]}:{local}" if prefixes[uri] else local
+
+
+def parse_iterparse(source, ctx):
+    """Dispatch a document while it is being parsed.
+
+    Each element is converted as soon as its end tag is read. Afterwards
+    its subtree is discarded, so only the currently open elements and
+    their direct children are kept in memory. The subtrees of the tags in
+    `KEEP_SUBTREE` survive until the tag itself is converted.
+
+    As with minidom, namespaced attributes keep their prefix, e.g.
+    `xml:lang`, and namespace declarations are kept as attributes.
+    """
+    frames = [[]]
+    keep = 0
+    prefixes = {XML_NAMESPACE: "xml"}
+    declared = []
+    for event, node in ET.iterparse(source, events=("start-ns", "start", "end")):
+        if event == "start-ns":
+            prefix, uri = node
+            prefixes[uri] = prefix
+            declared.append(node)
+            continue
+        if event == "start":
+            if declared or any(name.startswith("{") for name in node.attrib):
+                node.attrib = {prefixed_name(name, prefixes): value for name, value in node.attrib.items()}
+                node.attrib.update((f"xmlns:{prefix}" if prefix else "xmlns", uri) for prefix, uri in declared)
+                declared.clear()
+            frames.append([])
+            keep += node.tag in KEEP_SUBTREE
+            continue
+
+        converted = frames.pop()
+        children = [{"#text": node.text}] if node.text else []
+        for child, data in zip(node, converted):
+            children.append(data)
+            if child.tail:
+                children.append({"#text": child.tail})
+        frames[-1].append(dispatch_element(Element(node.tag, node.attrib, children, node), ctx))
+
+        keep -= node.tag in KEEP_SUBTREE
+        if not keep:
+            del node[:]
+    return frames[0][0]
+
+
+backends = {
+    "minidom": parse_minidom,
+    "iterparse": parse_iterparse
+}
+
+
+def member_owners(classes: dict) -> dict:
+    """Index of the owning class of every member.
+
+    A class declares the members which none of its direct bases list,
+    everything else is inherited. Only ids which no class declares, or
+    which multiple classes declare, fall back to the heuristic based on
+    the member id. If that fails too, e.g. for members of undocumented
+    bases, the member has no single owner and is mapped to None, so every
+    class listing it keeps its own copy. A warning is printed then.
+    """
+    listed = {id: set().union(*c["sectiondef"].values()) for id, c in classes.items()}
+
+    declared_by = defaultdict(list)
+    for id, c in classes.items():
+        inherited = set()
+        for base in c["basecompoundref"]:
+            inherited |= listed.get(base.get("@refid"), set())
+        for member_id in listed[id] - inherited:
+            declared_by[member_id].append(id)
+
+    owners = dict()
+    for id, members in listed.items():
+        for member_id in members:
+            if member_id in owners:
+                continue
+            candidates = declared_by.get(member_id, [])
+            if len(candidates) == 1:
+                owners[member_id] = candidates[0]
+                continue
+            owner_id = member_id.rpartition("_1")[0]
+            if owner_id not in classes:
+                print(f"warning: can't deduce the owning class of the member {member_id}, "
+                      f"keeping it in every class listing it", file=sys.stderr)
+                owner_id = None
+            owners[member_id] = owner_id
+    return owners
 
 
 def add_inheritance_section(data):
     """Segregate inherited members from non-inherited ones.
 
     Doxygen injects all members inherited from any base without
-    any relationship data. This deduces the original owner for any
-    member using a simple heuristic, based on the member id.
+    any relationship data. The original owner of each member is taken
+    from the index built by `member_owners`. The classes are either
+    dicts or `model.Compound` records, only the member ids are used.
+
+    A member is stored only once, under the class which owns it. In
+    the derived classes it is replaced by a reference `{"@refid": id}`,
+    unless the owner doesn't list the member itself. Members without an
+    owner are kept as declared by every class listing them.
     """
     classes = data["classes"]
-
-    owning_class = dict()
-    for id, c in classes.items():
-        for sec, members in c["sectiondef"].items():
-            for member_id in members:
-                owning_class[member_id] = member_id.rpartition("_1")[0]
-                if not owning_class[member_id] in classes:
-                    raise RuntimeError(f"Can't deduce heuristically the owning class of the member: {member_id}: {members[member_id]}")
+    owners = member_owners(classes)
+    own_members = {member_id for id, c in classes.items() for members in c["sectiondef"].values()
+                   for member_id in members if owners[member_id] == id}
 
     for id, c in classes.items():
         new_sectiondef = dict()
         for sec, members in c["sectiondef"].items():
             new_sectiondef[sec] = {"default": dict(), "inherited": dict()}
             for member_id, member in members.items():
-                owner_id = owning_class[member_id]
-                if owner_id == id:
+                owner_id = owners[member_id]
+                if owner_id is None or owner_id == id:
                     new_sectiondef[sec]["default"][member_id] = member
                 else:
-                    new_sectiondef[sec]["inherited"].setdefault(owner_id, dict())
-                    new_sectiondef[sec]["inherited"][owner_id][member_id] = member
+                    inherited = new_sectiondef[sec]["inherited"].setdefault(owner_id, dict())
+                    if member_id in own_members:
+                        inherited[member_id] = {"@refid": member_id}
+                    else:
+                        inherited[member_id] = member
         c["sectiondef"] = new_sectiondef
 
 
+def inherited_from(compound) -> list:
+    """The owners of the members a class inherits, after `add_inheritance_section`"""
+    return sorted({owner_id for sec in compound["sectiondef"].values() for owner_id in sec["inherited"]})
+
+
+@cache
+def converter_version() -> bytes:
+    """Hash of this converter, cached conversions of other versions are stale"""
+    return hashlib.sha256(Path(__file__).read_bytes()).digest()
+
+
+def read_compound(file) -> bytes:
+    return Path(file).read_bytes()
+
+
+# Suffix of the cache entries, only files with it are removed by prune_cache
+CACHE_SUFFIX = ".dispatch.json"
+
+
+def cache_entry(cache_dir, file) -> Path:
+    return Path(cache_dir) / f"{Path(file).stem}{CACHE_SUFFIX}"
+
+
+def prune_cache(cache_dir, files) -> int:
+    """Remove the cached compounds which are not among `files` anymore
+
+    Other files in `cache_dir` are kept. Returns the number of removed
+    entries.
+    """
+    current = {cache_entry(cache_dir, file).name for file in files}
+    removed = 0
+    for cache_file in Path(cache_dir).glob(f"*{CACHE_SUFFIX}"):
+        if cache_file.name not in current:
+            cache_file.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def dispatch_compound(file, ctx, content=None):
+    """Convert a single compound file, see `convert_compound`.
+
+    With `ctx.compact`, a class or namespace is packed into a
+    `model.Compound` right away, so its dicts are only held while the
+    file is converted. This also shrinks the results sent back by the
+    processes of a pool.
+    """
+    data, hit = convert_compound(file, ctx, content)
+    if ctx.compact and data and data["@kind"] != "file":
+        data = model.Compound.from_json(data)
+    return data, hit
+
+
+def convert_compound(file, ctx, content=None):
+    """Convert a single compound file.
+
+    `content` is the xml of the file, if it was already read, e.g. by
+    `prefetch`. If `ctx.cache_dir` is set, the converted compound is stored
+    there, keyed by the hash of the xml content and the converter version.
+    An unchanged compound is then loaded from the cache instead of parsed.
+    Returns the converted compound and whether it was a cache hit.
+    """
+    if content is None:
+        content = read_compound(file)
+    if ctx.cache_dir is None:
+        return backends[ctx.backend](io.BytesIO(content), ctx)["doxygen"]["compounddef"], False
+
+    key = hashlib.sha256(converter_version() + content).hexdigest()
+    cache_file = cache_entry(ctx.cache_dir, file)
+    try:
+        with open(cache_file, "r") as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            return cached["data"], True
+    except (OSError, ValueError, KeyError):
+        pass
+
+    data = backends[ctx.backend](io.BytesIO(content), ctx)["doxygen"]["compounddef"]
+
+    # write to a temporary file first, concurrent jobs may access the same entry
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump({"key": key, "data": data}, f)
+    os.replace(tmp_file, cache_file)
+    return data, False
+
+
+def prefetch(files, depth, budget):
+    """Read the files ahead in a pool of `depth` threads, yielding their content in order.
+
+    At most `depth` files are read or wait to be converted at the same
+    time. No further reads are started while the files waiting to be
+    converted hold more than `budget` bytes.
+    """
+    files = iter(files)
+    pending = deque()
+
+    def buffered() -> int:
+        return sum(len(f.result()) for f in pending if f.done() and f.exception() is None)
+
+    with ThreadPoolExecutor(max_workers=depth, thread_name_prefix="prefetch") as pool:
+        while True:
+            while len(pending) < depth and (not pending or buffered() < budget):
+                file = next(files, None)
+                if file is None:
+                    break
+                pending.append(pool.submit(read_compound, file))
+            if not pending:
+                return
+            yield pending.popleft().result()
+
+
+@dataclass
+class ReadStats(object):
+    """Time the converting process waited for the compound files and spent converting them"""
+    files: int = 0
+    bytes: int = 0
+    wait: float = 0.0
+    convert: float = 0.0
+
+    def report(self, stream=sys.stderr):
+        print(f"dispatch reader: {self.files} files, {self.bytes / 2 ** 20:.1f} MB, "
+              f"{self.wait:.2f}s waiting for reads, {self.convert:.2f}s converting", file=stream)
+
+
+def dispatch_compounds(files, ctx, stats=None):
+    """Dispatch the compound files, yielding the results of `dispatch_compound` in the order of `files`.
+
+    The compounds are independent of each other, so with `ctx.jobs > 1`
+    they are distributed over a pool of processes, which read their files
+    themselves. Otherwise, with `ctx.prefetch > 0`, the next files are read
+    by `prefetch` while the current one is converted. The time waited for
+    the files and spent converting them is added to `stats`.
+    """
+    if ctx.jobs > 1 and len(files) > 1:
+        chunksize = max(1, len(files) // (4 * ctx.jobs))
+        with ProcessPoolExecutor(max_workers=ctx.jobs) as pool:
+            yield from pool.map(dispatch_compound, files, repeat(replace(ctx, profiler=None)), chunksize=chunksize)
+        return
+
+    stats = stats if stats is not None else ReadStats()
+    if ctx.prefetch > 0:
+        contents = prefetch(files, ctx.prefetch, ctx.prefetch_bytes)
+    else:
+        contents = map(read_compound, files)
+    for file in files:
+        start = time.perf_counter()
+        content = next(contents)
+        read = time.perf_counter()
+        result = dispatch_compound(file, ctx, content)
+        end = time.perf_counter()
+        stats.files += 1
+        stats.bytes += len(content)
+        stats.wait += read - start
+        stats.convert += end - read
+        if ctx.profiler:
+            ctx.profiler.add("reader", "io wait", read - start)
+            ctx.profiler.add("reader", "convert", end - read)
+            ctx.profiler.item("compounds", Path(file).name, end - start)
+        yield result
+
 
 def dispatch_index(expr: MD.Document, ctx):
     data = dict(
@@ -277,6 +630,7 @@ def dispatch_index(expr: MD.Document, ctx):
 
     map_kind = {"class": "classes", "struct": "classes", "union": "classes",
                 "namespace": "namespaces", "file": "globals"}
+    compounds = []
     for compoud in index.getElementsByTagName('compound'):
         file = f"{ctx.directory}/{compoud.attributes['refid'].value}.xml"
         kind = compoud.attributes['kind'].value
@@ -285,8 +639,20 @@ def dispatch_index(expr: MD.Document, ctx):
             scope = map_kind[kind]
         except KeyError:
             continue
-
-        new_data = dispatch(MD.parse(file), ctx)["doxygen"]["compounddef"]
+        compounds.append((file, kind, scope))
+
+    if ctx.cache_dir is not None:
+        Path(ctx.cache_dir).mkdir(parents=True, exist_ok=True)
+
+    hits = 0
+    files = [file for file, _, _ in compounds]
+    stats = ReadStats()
+    with profiling.phase(ctx.profiler, "convert compounds"):
+        converted = list(zip(compounds, dispatch_compounds(files, ctx, stats)))
+    if ctx.prefetch > 0 and stats.files:
+        stats.report()
+    for (file, kind, scope), (new_data, hit) in converted:
+        hits += hit
         if new_data and kind != "file":
             data[scope][new_data["@id"]] = new_data
         if new_data and kind == "file":
@@ -316,35 +682,229 @@ def dispatch_index(expr: MD.Document, ctx):
                 for member in sec.values():
                     data[scope]['sectiondef'].setdefault(kind, dict())[member["@id"]] = member
 
-    add_inheritance_section(data)
+    if ctx.cache_dir is not None:
+        removed = prune_cache(ctx.cache_dir, files)
+        print(f"dispatch cache: {hits} hits, {len(compounds) - hits} misses, {removed} removed", file=sys.stderr)
+
+    with profiling.phase(ctx.profiler, "inheritance"):
+        add_inheritance_section(data)
+
+    if ctx.compact:
+        for scope in ["classes", "namespaces"]:
+            data[scope] = model.CompactMap(data[scope])
 
     return data
 
 
-@dataclass
-class Context(object):
-    directory: str
+def dispatch_directory(ctx):
+    """Convert the doxygen xml in `ctx.directory`, starting from its index.xml"""
+    index = Path(ctx.directory) / "index.xml"
+    with profiling.phase(ctx.profiler, "parse index"):
+        dom = MD.parse(str(index.resolve()))
+    return dispatch_index(dom, ctx)
+
+
+def write_json(data, stream, indent=None):
+    """Write the converted data as a single JSON object to `stream`.
+
+    Without `indent` the output is compact and written one compound at a
+    time, so the complete JSON string is never held in memory. The
+    compounds may also be given as a `model.CompactMap`.
+    """
+    if indent is not None:
+        json.dump(data, stream, indent=indent, default=dict)
+        stream.write("\n")
+        return
+
+    separators = (",", ":")
+    stream.write("{")
+    for i, (scope, compounds) in enumerate(data.items()):
+        stream.write(f"{',' if i else ''}{json.dumps(scope)}:{{")
+        for j, (key, compound) in enumerate(compounds.items()):
+            stream.write(f"{',' if j else ''}{json.dumps(key)}:{json.dumps(compound, separators=separators)}")
+        stream.write("}")
+    stream.write("}\n")
+
+
+def write_shards(data, directory, indent=None):
+    """Write each class and namespace into its own JSON file below `directory`.
+
+    The globals are written as a whole into `globals.json`. The file
+    `manifest.json` lists the location of every compound together with the
+    data needed to relate the classes to each other, i.e. their names and
+    inner classes, and the classes they inherit members from, so readers
+    can load the compounds lazily.
+    """
+    directory = Path(directory)
+    separators = None if indent is not None else (",", ":")
+
+    def dump(obj, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(obj, f, indent=indent, separators=separators)
+
+    manifest = dict(classes=dict(), namespaces=dict(), globals="globals.json")
+    for scope in ["classes", "namespaces"]:
+        for id, compound in data[scope].items():
+            file = f"{scope}/{id}.json"
+            dump(compound, directory / file)
+            manifest[scope][id] = {"name": compound["name"], "file": file}
+            if scope == "classes":
+                manifest[scope][id]["innerclass"] = compound["innerclass"]
+                manifest[scope][id]["owners"] = inherited_from(compound)
+    dump(data["globals"], directory / manifest["globals"])
+    dump(manifest, directory / "manifest.json")
+
+
+# First bytes of a binary map, see write_binary
+BINARY_MAGIC = b"MASPMAP1"
+
+
+def write_binary(data, path):
+    """Write the converted data as a binary map, which make_rst.py can map into memory.
+
+    After `BINARY_MAGIC` the file holds every class and namespace, and the
+    globals, as a compact JSON record. It ends with an index of the
+    records and the 8 byte little endian offset of this index. The index
+    has the layout of the manifest of `write_shards`, with the offset and
+    size of each record instead of its file, so a reader only decodes the
+    records it needs.
+    """
+    separators = (",", ":")
+
+    with open(path, "wb") as f:
+        f.write(BINARY_MAGIC)
 
+        def record(obj) -> dict:
+            offset = f.tell()
+            f.write(json.dumps(obj, separators=separators).encode())
+            return {"offset": offset, "size": f.tell() - offset}
 
-xml_directory = simple_directory
+        index = dict(classes=dict(), namespaces=dict())
+        for scope in ["classes", "namespaces"]:
+            for id, compound in data[scope].items():
+                index[scope][id] = {"name": compound["name"]} | record(compound)
+                if scope == "classes":
+                    index[scope][id]["innerclass"] = compound["innerclass"]
+                    index[scope][id]["owners"] = inherited_from(compound)
+        index["globals"] = record(data["globals"])
 
-parser = argparse.ArgumentParser(
-    description="Translates doxygen xml output into a more sensible format"
-)
+        index_offset = f.tell()
+        f.write(json.dumps(index, separators=separators).encode())
+        f.write(struct.pack("<Q", index_offset))
 
-parser.add_argument('-d', '--doxygen',
-                    required=False,
-                    default=xml_directory,
-                    help="Path to the doxygen generated xml directory"
-                    )
 
-args = parser.parse_args()
+@dataclass
+class Context(object):
+    directory: str
+    backend: str = "minidom"
+    jobs: int = 1
+    cache_dir: str | None = None
+    compact: bool = False
+    prefetch: int = 0
+    prefetch_bytes: int = 64 * 2 ** 20
+    profiler: profiling.Profiler | None = None
 
-xml_directory = args.doxygen or xml_directory
 
-index = Path(xml_directory) / "index.xml"
-dom = MD.parse(str(index.resolve()))
+def main():
+    xml_directory = simple_directory
 
-parsed = dispatch_index(dom, Context(directory=xml_directory))
+    parser = argparse.ArgumentParser(
+        description="Translates doxygen xml output into a more sensible format"
+    )
 
-print(json.dumps(parsed, indent=2))
+    parser.add_argument('-d', '--doxygen',
+                        required=False,
+                        default=xml_directory,
+                        help="Path to the doxygen generated xml directory"
+                        )
+    parser.add_argument('-b', '--backend',
+                        choices=backends.keys(),
+                        default="minidom",
+                        help="XML parser used for the compound files. 'iterparse' converts "
+                             "the files while streaming them and needs less memory"
+                        )
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        default=1,
+                        help="Number of processes used to convert the compound files"
+                        )
+    parser.add_argument('--cache-dir',
+                        default=".dispatch_cache",
+                        help="Directory for the converted compounds. Compounds whose xml "
+                             "did not change are loaded from there instead of reconverted. The "
+                             "cache is used by default, in .dispatch_cache below the current "
+                             "working directory. Entries of compounds which are no longer in the "
+                             f"index are removed, other files than the *{CACHE_SUFFIX} entries are kept"
+                        )
+    parser.add_argument('--no-cache',
+                        action="store_true",
+                        help="Convert all compounds and don't update the cache"
+                        )
+    parser.add_argument('--prefetch',
+                        type=int,
+                        default=0,
+                        metavar='N',
+                        help="Read up to N compound files ahead in background threads while "
+                             "converting, e.g. on a network file system. Only used with one job"
+                        )
+    parser.add_argument('--prefetch-mb',
+                        type=int,
+                        default=64,
+                        metavar='MB',
+                        help="Don't read further ahead while the prefetched files hold this much"
+                        )
+    parser.add_argument('-o', '--output',
+                        help="File to write the JSON map to, defaults to stdout"
+                        )
+    parser.add_argument('--indent',
+                        type=int,
+                        help="Pretty print the JSON with this indentation, the output is compact otherwise"
+                        )
+    parser.add_argument('--shard-dir',
+                        help="Write one JSON file per compound and a manifest.json into this "
+                             "directory instead of a single JSON map"
+                        )
+    parser.add_argument('--binary',
+                        metavar='FILE',
+                        help="Write a binary map to FILE instead of a JSON map. make_rst.py maps "
+                             "it into memory and only decodes the compounds it renders"
+                        )
+    parser.add_argument('--compact',
+                        action="store_true",
+                        help="Pack each class and namespace into the compact model of model.py as "
+                             "soon as it is converted, which needs less memory"
+                        )
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    xml_directory = args.doxygen or xml_directory
+
+    profiler = profiling.from_args(args)
+    if profiler:
+        profiler.start()
+
+    ctx = Context(directory=xml_directory, backend=args.backend, jobs=args.jobs,
+                  cache_dir=None if args.no_cache else args.cache_dir, compact=args.compact,
+                  prefetch=args.prefetch, prefetch_bytes=args.prefetch_mb * 2 ** 20, profiler=profiler)
+    parsed = dispatch_directory(ctx)
+
+    with profiling.phase(profiler, "write output"):
+        if args.shard_dir:
+            write_shards(parsed, args.shard_dir, indent=args.indent)
+        elif args.binary:
+            write_binary(parsed, args.binary)
+        elif args.output:
+            with open(args.output, "w") as f:
+                write_json(parsed, f, indent=args.indent)
+        else:
+            write_json(parsed, sys.stdout, indent=args.indent)
+
+    if profiler:
+        profiler.stop()
+        profiler.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,813 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import warnings
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatchcase
+from functools import cache, lru_cache
+from itertools import groupby
+
+import jinja2
+from pathlib import Path
+
+import profiling
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generates source files based on a jinja2 template "
+                    "and a json variable map")
+    parser.add_argument(
+        '-t', '--template', required=True,
+        help='path to the jinja2 template dir')
+    parser.add_argument(
+        '-m', '--map',
+        help='path to the json variable map file, to the directory '
+             '(or manifest.json) of a sharded map, or to a binary map')
+    parser.add_argument(
+        '-o', '--output',
+        help='path to the output dir')
+    parser.add_argument(
+        '--title', default="C++ API Reference",
+        help='The title of the index for the API'
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='number of processes used to render the class pages')
+    parser.add_argument(
+        '--filter', action='append', metavar='PATTERN',
+        help='only render classes whose qualified name matches this glob '
+             'pattern, e.g. "gko::matrix::*". Can be given multiple times')
+    parser.add_argument(
+        '--limit', type=int,
+        help='render at most this many classes, e.g. for quick previews')
+    parser.add_argument(
+        '--bytecode-cache', metavar='DIR',
+        help='directory to cache the compiled templates in, which is '
+             'reused by later runs with the same templates')
+    parser.add_argument(
+        '--compile-templates', action='store_true',
+        help=f'compile the templates once into the "{COMPILED_TEMPLATES}" '
+             'subdirectory of the template dir and exit. Later runs load '
+             'the compiled templates from there, e.g. after installation, '
+             'as long as the templates are unchanged')
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+    if not args.compile_templates and (args.map is None or args.output is None):
+        parser.error("the following arguments are required: -m/--map, -o/--output")
+    return args
+
+
+TEMPLATE_BRACKETS = re.compile("[<>]")
+
+
+@lru_cache(maxsize=None)
+def compile_scope(scope: str) -> re.Pattern:
+    return re.compile(re.escape(scope))
+
+
+def skip_template_arguments(s: str, pos: int) -> int:
+    """Get the position after the template argument list starting at `pos`
+
+    If there is no argument list at `pos`, then `pos` is returned.
+    """
+    if not s.startswith("<", pos):
+        return pos
+    nesting_level = 0
+    for m in TEMPLATE_BRACKETS.finditer(s, pos):
+        if m.group() == "<":
+            nesting_level = nesting_level + 1
+        else:
+            nesting_level = nesting_level - 1
+            if nesting_level == 0:
+                return m.end()
+    raise RuntimeError(f"Encountered unbalanced template brackets in string: {s[pos:]}")
+
+
+def strip_scope(s: str, scope: str) -> str:
+    """Remove the qualification with `scope` from all names in `s`
+
+    Every occurrence of `scope`, optionally followed by template arguments,
+    and then followed by `::` is removed. Occurrences without the trailing
+    `::` are kept. The string is scanned only once.
+    """
+    if not scope:
+        return s
+    pattern = compile_scope(scope)
+    parts = []
+    copied = search = 0
+    while m := pattern.search(s, search):
+        end = skip_template_arguments(s, m.end())
+        if s.startswith("::", end):
+            parts.append(s[copied:m.start()])
+            copied = search = end + 2
+        else:
+            search = m.start() + 1
+    parts.append(s[copied:])
+    return "".join(parts)
+
+
+@lru_cache(maxsize=8192)
+def strip_scope_cached(s: str, scope: str) -> str:
+    return strip_scope(s, scope)
+
+
+def normalize(s: str, scope: str) -> str:
+    # only short strings, e.g. signatures, are repeated often enough to cache them
+    if len(s) > 1024:
+        return strip_scope(s, scope)
+    return strip_scope_cached(s, scope)
+
+
+COMPILED_TEMPLATES = "compiled"
+# Hash of the template sources the compiled templates were compiled from
+COMPILED_SOURCES = "sources.sha256"
+
+
+@cache
+def renderer_version() -> bytes:
+    """Hash of this renderer, pages rendered by other versions are stale"""
+    return hashlib.sha256(Path(__file__).read_bytes()).digest()
+
+
+def hash_templates(path) -> str:
+    """Hash of the names and contents of the templates in `path`"""
+    h = hashlib.sha256()
+    for template in sorted(Path(path).glob("*.tmpl")):
+        h.update(template.name.encode() + b"\0" + template.read_bytes() + b"\0")
+    return h.hexdigest()
+
+
+def compiled_templates(path) -> Path | None:
+    """The templates compiled by `compile_templates`, unless they are missing or stale"""
+    compiled = Path(path) / COMPILED_TEMPLATES
+    try:
+        compiled_hash = (compiled / COMPILED_SOURCES).read_text().strip()
+    except OSError:
+        return None
+    if compiled_hash != hash_templates(path):
+        # a warning is shown once, not for every environment
+        warnings.warn(f"the compiled templates in {compiled} are stale, using the sources instead. "
+                      f"Rerun make_rst.py --compile-templates to update them")
+        return None
+    return compiled
+
+
+def create_jinja_env(path, bytecode_cache=None) -> jinja2.Environment:
+    """Jinja environment for the templates in `path`
+
+    Templates compiled by `compile_templates` are preferred over the
+    sources, as long as they were compiled from the current sources.
+    Otherwise, if `bytecode_cache` is given, the compiled sources are
+    cached in that directory.
+    """
+    loader = jinja2.FileSystemLoader(path)
+    compiled = compiled_templates(path)
+    if compiled is not None:
+        loader = jinja2.ChoiceLoader([jinja2.ModuleLoader(compiled), loader])
+    if bytecode_cache is not None:
+        Path(bytecode_cache).mkdir(parents=True, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(bytecode_cache)
+    env = jinja2.Environment(loader=loader, bytecode_cache=bytecode_cache,
+                             keep_trailing_newline=True, trim_blocks=True, lstrip_blocks=True)
+    env.filters["normalize"] = normalize
+
+    return env
+
+
+def compile_templates(path):
+    """Compile the templates in `path` to python modules next to them
+
+    The hash of the sources is stored with them, so they are only used
+    while the sources are unchanged.
+    """
+    compiled = Path(path) / COMPILED_TEMPLATES
+    (compiled / COMPILED_SOURCES).unlink(missing_ok=True)
+    env = create_jinja_env(path)
+    env.loader = jinja2.FileSystemLoader(path)
+    env.compile_templates(compiled, zip=None,
+                          filter_func=lambda name: name.endswith(".tmpl"), ignore_errors=False)
+    (compiled / COMPILED_SOURCES).write_text(hash_templates(path) + "\n")
+
+
+class ShardedMap(Mapping):
+    """Compounds of a sharded variable map
+
+    Each compound is read from its own file when it is accessed and is not
+    kept afterwards. The manifest entries of the compounds are available
+    as `index`, the undecoded JSON of a compound as `record`.
+    """
+
+    def __init__(self, directory: Path, index: dict):
+        self.directory = directory
+        self.index = index
+
+    def record(self, key) -> bytes:
+        return (self.directory / self.index[key]["file"]).read_bytes()
+
+    def __getitem__(self, key):
+        return json.loads(self.record(key))
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+# First bytes of a binary map, see write_binary of dispatch.py
+BINARY_MAGIC = b"MASPMAP1"
+
+
+class BinaryMap(Mapping):
+    """Compounds of a binary variable map
+
+    The file is mapped into memory and a compound is decoded from its
+    record when it is accessed, it is not kept afterwards. The index
+    entries of the compounds are available as `index`, the undecoded
+    records as `record`. When it is sent to another process, the file is
+    mapped again there.
+    """
+
+    def __init__(self, path: Path, buffer: mmap.mmap, index: dict):
+        self.path = path
+        self.buffer = buffer
+        self.index = index
+
+    def __getstate__(self):
+        return {"path": self.path, "index": self.index}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], open_binary_map(state["path"]), state["index"])
+
+    def record(self, key) -> bytes:
+        entry = self.index[key]
+        return self.buffer[entry["offset"]:entry["offset"] + entry["size"]]
+
+    def __getitem__(self, key):
+        return json.loads(self.record(key))
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+def open_binary_map(path) -> mmap.mmap | None:
+    """Map the file into memory if it is a binary map, otherwise return None"""
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            return None
+        # The mapping stays valid after the file is closed
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_binary_map(path: Path, buffer: mmap.mmap) -> dict:
+    index_offset, = struct.unpack("<Q", buffer[-8:])
+    index = json.loads(buffer[index_offset:-8])
+    return {scope: BinaryMap(path, buffer, index[scope]) for scope in ["classes", "namespaces"]}
+
+
+def read_var_map(path):
+    """Read a variable map written by dispatch.py
+
+    For a sharded or a binary map only the index of the compounds is read,
+    the classes and namespaces are loaded on access. The globals are not
+    used here and thus not read.
+    """
+    path = Path(path)
+    if path.is_dir():
+        path = path / "manifest.json"
+    buffer = open_binary_map(path)
+    if buffer is not None:
+        return read_binary_map(path, buffer)
+    with open(path, "r") as f:
+        var_map = json.load(f)
+    # endwith
+    if path.name == "manifest.json":
+        return {scope: ShardedMap(path.parent, var_map[scope]) for scope in ["classes", "namespaces"]}
+    return var_map
+
+
+def read_class_index(classes) -> dict:
+    """Get the name and inner classes of each class
+
+    This is all that is needed to relate the classes to each other. For a
+    sharded or a binary map it is taken from its index without loading any
+    class, similarly for the compact model of dispatch.py.
+    """
+    if hasattr(classes, "index"):
+        return classes.index
+    return {key: {"name": data["name"], "innerclass": data["innerclass"]} for key, data in classes.items()}
+
+
+def strip_class_name_specialization(name):
+    return ''.join(name.partition('<')[0:1]).rstrip()
+
+
+def is_class_name_specialization(name):
+    return strip_class_name_specialization(name) != name
+
+
+def force_single_line(para):
+    try:
+        if len(para) > 1:
+            raise
+        return "".join(para[0]).rstrip()
+    except:
+        print(f"Encountered nested paragraphs: {para}", file=sys.stderr)
+        return ""
+        # raise RuntimeError("Can't handle parameter description with multiple paragraphs")
+
+
+def flatten(xs):
+    result = []
+    iterators = [iter(xs)]
+    while iterators:
+        for x in iterators[-1]:
+            if isinstance(x, list):
+                iterators.append(iter(x))
+                break
+            result.append(x)
+        else:
+            iterators.pop()
+    return result
+
+
+def first(results):
+    return results[0]
+
+
+class Step(object):
+    """Deferred conversion of an expression
+
+    The expression is converted by applying `combine` to the converted
+    `subexprs`.
+    """
+    __slots__ = ("subexprs", "combine")
+
+    def __init__(self, subexprs, combine):
+        self.subexprs = subexprs
+        self.combine = combine
+
+
+def stringify_step(expr):
+    """Convert an expression, or return a `Step` if sub-expressions have to be converted first"""
+    match expr:
+        case str(body):
+            return body
+        case list(l):
+            return Step(l, list)
+        case {"@id": id, **kwargs}:
+            return Step([{"id": id, **kwargs}], first)
+        case {"@refid": id, "#text": name}:
+            bracket_replacement = '\\<'
+            id_str = f"<{id}>" if id else ""
+            return f":std:ref:`{name.replace('<', bracket_replacement)}{id_str}`"
+        case {"ref": ref}:
+            return Step([ref], first)
+        case {"formula": {"#text": code}}:
+            if code.startswith("\["):
+                if not code.endswith("\]"):
+                    raise RuntimeError(f"Can't handle math element: {code}")
+                code = code.strip("\[]")
+                if not isinstance(code, list):
+                    code = [code]
+                return {"@directive": "math", "lines": [code]}
+            else:
+                code = code.strip("$")
+                return f":math:`{code}`"
+        case {"computeroutput": {"#text": code}}:
+            return f":code:`{code}`"
+        case {"codeline": code}:
+            return Step([code], first)
+        case {"programlisting": {"style": style, **para}}:
+            return Step([para], lambda r: {"@directive": "code-block", "@opts": style, "lines": r[0]})
+        case {"@kind": "parameter", "name": name, "description": desc}:
+            return f":param {name}: {desc}"
+        case {"@kind": "templateparameter", "parameter": param}:
+            return Step([param], lambda r: ' '.join(r[0]))
+        case {"simplesect": {"@kind": "see", **para}}:
+            return Step([para], lambda r: f"see {force_single_line(r[0])}")
+        case {"simplesect": {"@kind": "return", **para}}:
+            return Step([para], lambda r: f":return: {force_single_line(r[0])}")
+        case {"simplesect": {"@kind": "note", **para}}:
+            return Step([para], lambda r: {"@directive": "note", "lines": r[0]})
+        case {"simplesect": {"@kind": "warning", **para}}:
+            return Step([para], lambda r: {"@directive": "warning", "lines": r[0]})
+        case {"itemizedlist": {"listitem": items}}:
+            return Step([item['para'] for item in items],
+                        lambda r: ["\n"] + [f"* {force_single_line(p)}" for p in r] + ["\n"])
+        case {"orderedlist": {"listitem": items}}:
+            return Step([item['para'] for item in items],
+                        lambda r: ["\n"] + [f"{n}. {force_single_line(p)}" for n, p in enumerate(r)] + ["\n"])
+        case {"blockquote": para}:
+            return Step([para], lambda r: {"@directive": "epigraph", "lines": r[0]})
+        case {"@kind": kind, "parametername": name, "parameterdescription": desc}:
+            role = "tparam" if kind == "templateparameter" else "param"
+            return Step([{'para': desc}], lambda r: {"@role": f"{role} {name}", "lines": r[0]})
+        case {"parameternamelist": {"parametername": name}, "parameterdescription": desc}:
+            return Step([desc, name], lambda r: {"name": r[1], "desc": force_single_line(r[0])})
+        case {"parameterlist": {"parameteritem": items, **kwargs}}:
+            role = "tparam" if kwargs.get("@kind", "") == "templateparam" else "param"
+            return Step([items], lambda r: [{"@role": f"{role} {item['name']}", "lines": item["desc"]}
+                                            for item in r[0]])
+        case {"para": para}:
+            return Step(list(para), lambda r: [flatten(p) for p in r])
+        case {"ulink": {"@url": url, "#text": text}}:
+            return f"`{text} <{url}>`_"
+        case {"heading": {"@level": level, "#text": text}}:
+            level = int(level)
+            sym = {0: "#", 1: "*", 2: "=", 3: "-", 4: "^", 5: '"'}
+            return f'{sym[level] * len(text)}\n{text}\n{sym[level] * len(text)}'
+        case {"bold": text}:
+            return Step([text], lambda r: f"**{r[0]}**")
+        case {"emphasis": text}:
+            return Step([text], lambda r: f"*{r[0]}*")
+        case {"ndash": _}:
+            return "---"
+        case {"#text": text}:
+            return text
+        case dict(d):
+            return Step(list(d.values()), lambda r: dict(zip(d.keys(), r)))
+
+
+class MemberCache(OrderedDict):
+    """Least recently used cache for the converted members, keyed by member id"""
+
+    def __init__(self, maxsize=16384):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def lookup(self, key):
+        value = self.get(key, self)
+        if value is not self:
+            self.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        self[key] = value
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+def stringify(expr, cache: MemberCache = None):
+    """Convert the variable map data of a class into strings and directives
+
+    The expression tree is traversed with an explicit stack. If a `cache`
+    is given, the results for nested dicts with an `@id`, i.e. members,
+    are reused. Doxygen emits the same data for a member in every class
+    which inherits it, so inherited members are only converted once.
+    """
+    stack = []
+    task = expr
+    while True:
+        key = None
+        if cache is not None and task is not expr and isinstance(task, dict) and "@id" in task:
+            key = task["@id"]
+            value = cache.lookup(key)
+            step = value if value is not cache else stringify_step(task)
+        else:
+            step = stringify_step(task)
+
+        if isinstance(step, Step) and step.subexprs:
+            stack.append((step, [], key))
+            task = step.subexprs[0]
+            continue
+
+        value = step.combine([]) if isinstance(step, Step) else step
+        if key is not None:
+            cache.store(key, value)
+        while stack:
+            step, results, key = stack[-1]
+            results.append(value)
+            if len(results) < len(step.subexprs):
+                task = step.subexprs[len(results)]
+                break
+            stack.pop()
+            value = step.combine(results)
+            if key is not None:
+                cache.store(key, value)
+        else:
+            return value
+
+
+def get_class_id_by_name(name, ids_by_name):
+    try:
+        return ids_by_name[name]
+    except KeyError:
+        print("Couldn't find name in class")
+        exit(-1)
+
+
+def extract_class_template_parameters(data: dict) -> dict:
+    """Extract template parameters description form brief/detailed description
+
+    Since our .rst template introduces sections, we have to make sure that
+    the class template parameter description is before any sections within
+    a class. Thus, the description is removed from the normal doxygen place,
+    and put into its own array.
+    """
+    template_desc = []
+    for desc in ["briefdescription", "detaileddescription"]:
+        removal_idxs = []
+        for pid, para in enumerate(data[desc]):
+            for lid, line in enumerate(para):
+                match line:
+                    case {"@role": role}:
+                        if role.startswith("tparam"):
+                            removal_idxs.append((pid, lid))
+                    case _:
+                        pass
+        for pid, lid in removal_idxs:
+            template_desc.append(data[desc][pid][lid])
+        for pid, lid in sorted(removal_idxs, reverse=True):
+            del data[desc][pid][lid]
+    return data | {"templatedescription": template_desc}
+
+
+def declared_members(data: dict) -> dict:
+    """Get the members a class declares itself, by id"""
+    return {member_id: member
+            for sec in data["sectiondef"].values() for member_id, member in sec["default"].items()}
+
+
+def resolve_inherited_members(data: dict, lookup_members):
+    """Replace the references to inherited members by the members themselves
+
+    dispatch.py stores each member only under its owning class and refers
+    to it by `{"@refid": id}` from derived classes. `lookup_members` maps
+    an owner id to the members it declares.
+    """
+    for sec in data["sectiondef"].values():
+        for owner_id, members in sec["inherited"].items():
+            if any("@id" not in member for member in members.values()):
+                owner_members = lookup_members(owner_id)
+                sec["inherited"][owner_id] = {
+                    member_id: member if "@id" in member else owner_members[member["@refid"]]
+                    for member_id, member in members.items()
+                }
+    return data
+
+
+def build_name_index(class_index: dict):
+    """Index the classes by name in a single pass
+
+    Returns the id of each class name (the first one for duplicate names),
+    the ids of the specializations per stripped class name, and the set of
+    all inner classes.
+    """
+    ids_by_name = dict()
+    specializations_by_name = dict()
+    all_inner_classes = set()
+    for key, data in class_index.items():
+        name = data["name"]
+        ids_by_name.setdefault(name, key)
+        if is_class_name_specialization(name):
+            specializations_by_name.setdefault(strip_class_name_specialization(name), []).append(key)
+        all_inner_classes.update(data["innerclass"])
+    return ids_by_name, specializations_by_name, all_inner_classes
+
+
+def relate_classes(class_index: dict) -> dict:
+    """Derive the inner class and specialization relationships
+
+    Returns for each class the entries which are added to its data before
+    rendering.
+    """
+    ids_by_name, specializations_by_name, all_inner_classes = build_name_index(class_index)
+
+    relations = {key: {"specializations": {}} for key in class_index}
+
+    for ic in all_inner_classes:
+        relations[ic]["is_inner"] = True
+
+    for key, data in class_index.items():
+        relations[key]['is_special'] = is_class_name_specialization(data["name"]) and key not in all_inner_classes
+
+    for stripped_name, keys in specializations_by_name.items():
+        special_keys = [key for key in keys if relations[key]['is_special']]
+        if not special_keys:
+            continue
+        stripped_id = get_class_id_by_name(stripped_name, ids_by_name)
+        for key in special_keys:
+            relations[key]['specialization_of'] = stripped_id
+            if stripped_id != class_index[key]['name']:
+                relations[stripped_id]['specializations'][key] = {'name': class_index[key]['name']}
+
+    return relations
+
+
+def select_classes(class_index: dict, patterns=None, limit=None) -> list:
+    """Get the ids of the classes to render, in the order of the map"""
+    selected = [key for key, data in class_index.items()
+                if not patterns or any(fnmatchcase(data["name"], p) for p in patterns)]
+    return selected[:limit]
+
+
+def index_classes(class_index: dict, relations: dict, selected: list) -> dict:
+    """Get the classes listed in the index, sorted by name"""
+    classes = {key: {"name": class_index[key]["name"],
+                     "hidden": relations[key]["is_special"] or relations[key].get("is_inner", False)}
+               for key in selected}
+    return dict(sorted(classes.items(), key=lambda k: k[1]['name']))
+
+
+def write_atomic(path: Path, content: str):
+    """Write a file such that readers never see it partially written"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    # endwith
+    os.replace(tmp_path, path)
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write `content` to `path` unless the file already has this content
+
+    Unchanged files keep their modification time, so sphinx only re-reads
+    the pages which actually changed. Returns whether the file was written.
+    """
+    try:
+        with open(path, "r") as f:
+            if f.read() == content:
+                return False
+        # endwith
+    except FileNotFoundError:
+        pass
+    write_atomic(path, content)
+    return True
+
+
+PAGES_MANIFEST = ".make_rst_pages"
+
+
+def remove_stale_pages(out_dir: Path, pages: list[str]) -> int:
+    """Delete the pages of a previous run which were not generated again
+
+    The generated pages are recorded in a manifest in the output dir, so
+    only files created by this script are ever removed. Returns the number
+    of removed pages.
+    """
+    manifest = out_dir / PAGES_MANIFEST
+    try:
+        previous = set(manifest.read_text().split())
+    except FileNotFoundError:
+        previous = set()
+    stale = previous - set(pages)
+    for name in stale:
+        (out_dir / name).unlink(missing_ok=True)
+    write_if_changed(manifest, "".join(f"{name}\n" for name in sorted(pages)))
+    return len(stale)
+
+
+class ClassRenderer(object):
+    """Renders the page of a single class
+
+    Each rendering process creates one renderer, and with it one jinja
+    environment, which is then used for all of its classes. With a
+    profiler, the time spent in `prepare`, the template and the normalize
+    filter is counted.
+    """
+
+    def __init__(self, template_dir, classes, class_names, bytecode_cache=None, profiler=None):
+        env = create_jinja_env(template_dir, bytecode_cache)
+        if profiler:
+            env.filters["normalize"] = profiler.timed("render steps", "normalize", env.filters["normalize"])
+        self.template = env.get_template("class.rst.tmpl")
+        self.render_template = self.template.render
+        if profiler:
+            self.prepare = profiler.timed("render steps", "stringify", self.prepare)
+            self.render_template = profiler.timed("render steps", "template", self.render_template)
+        self.classes = classes
+        self.class_names = class_names
+        self.member_cache = MemberCache()
+        self.lookup_members = lru_cache(maxsize=256)(self.load_declared_members)
+
+    def load_declared_members(self, key) -> dict:
+        return declared_members(self.classes[key])
+
+    def prepare(self, key, relations) -> dict:
+        """Get the template variables of a class"""
+        data = resolve_inherited_members(self.classes[key], self.lookup_members) | relations
+        data["specializations"] = dict(sorted(data["specializations"].items(), key=lambda k: k[1]["name"]))
+        data["hidden"] = data.get("is_special", False) or data.get("is_inner", False)
+        string_data = stringify(data, self.member_cache)
+        string_data = extract_class_template_parameters(string_data)
+        string_data.update(class_names=self.class_names)
+        return string_data
+
+    def render(self, key, relations) -> str:
+        return self.render_template(self.prepare(key, relations))
+
+
+renderer = None
+
+
+def init_renderer(template_dir, classes, class_names, bytecode_cache=None, profiler=None):
+    global renderer
+    renderer = ClassRenderer(template_dir, classes, class_names, bytecode_cache, profiler)
+
+
+def write_class_page(key, relations, out_file) -> bool:
+    return write_if_changed(out_file, renderer.render(key, relations))
+
+
+def render_pages(var_map, template_dir, out_dir, title="C++ API Reference", jobs=1, patterns=None, limit=None,
+                 bytecode_cache=None, profiler=None):
+    """Render the class pages and the index of a variable map into `out_dir`
+
+    The variable map is either read by `read_var_map` or produced in the
+    same process by dispatch.py. Returns the number of pages written, left
+    unchanged and removed. The statistics of single pages are only
+    collected by the `profiler` if the pages are rendered in this process.
+    """
+    template_dir = Path(template_dir)
+    template_env = create_jinja_env(template_dir, bytecode_cache)
+    classes = var_map["classes"]
+
+    with profiling.phase(profiler, "relations"):
+        class_index = read_class_index(classes)
+        relations = relate_classes(class_index)
+
+    class_names = {id: c["name"] for id, c in class_index.items()}
+
+    selected = select_classes(class_index, patterns, limit)
+
+    out_dir = Path(out_dir)
+    # This is safer for use with http urls
+    out_files = [out_dir / f"{key}.rst" for key in selected]
+    page_relations = [relations[key] for key in selected]
+    renderer_args = (template_dir, classes, class_names, bytecode_cache)
+    with profiling.phase(profiler, "render pages"):
+        if jobs > 1:
+            chunksize = max(1, len(selected) // (4 * jobs))
+            with ProcessPoolExecutor(max_workers=jobs, initializer=init_renderer,
+                                     initargs=renderer_args) as pool:
+                written = sum(pool.map(write_class_page, selected, page_relations, out_files, chunksize=chunksize))
+        elif profiler:
+            init_renderer(*renderer_args, profiler)
+            written = 0
+            for page in zip(selected, page_relations, out_files):
+                start = time.perf_counter()
+                written += write_class_page(*page)
+                profiler.item("pages", page[0], time.perf_counter() - start)
+        else:
+            init_renderer(*renderer_args)
+            written = sum(write_class_page(*page) for page in zip(selected, page_relations, out_files))
+
+    # out_globs = out_dir / "globals.rst"
+    # template_globs = read_template(template_dir / "globals.rst.tmpl")
+    # with open(out_globs, "w") as f:
+    #     f.write(template_globs.render(var_map))
+    # endwith
+
+    out_index = out_dir / "index.rst"
+    with profiling.phase(profiler, "render index"):
+        index_template = template_env.get_template("index.rst.tmpl")
+        written += write_if_changed(out_index, index_template.render(
+            title=title, classes=index_classes(class_index, relations, selected)))
+
+    pages = [out_file.name for out_file in out_files] + [out_index.name]
+    removed = remove_stale_pages(out_dir, pages)
+    return written, len(pages) - written, removed
+
+
+def main():
+    args = parse_args()
+
+    if args.compile_templates:
+        compile_templates(args.template)
+        return
+
+    profiler = profiling.from_args(args)
+    if profiler:
+        profiler.start()
+
+    with profiling.phase(profiler, "read map"):
+        var_map = read_var_map(args.map)
+    written, unchanged, removed = render_pages(var_map, args.template, args.output,
+                                               title=args.title, jobs=args.jobs, patterns=args.filter,
+                                               limit=args.limit, bytecode_cache=args.bytecode_cache,
+                                               profiler=profiler)
+    print(f"make_rst: {written} pages written, {unchanged} unchanged, {removed} removed",
+          file=sys.stderr)
+
+    if profiler:
+        profiler.stop()
+        profiler.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Compact in-memory model of the converted compounds
+
+The JSON shape produced by dispatch.py consists of many small dicts,
+lists and single `#text` entries, which repeat the same keys, ids and
+type strings for every member. This model stores the same data with
+less overhead:
+
+- `Compound`, `Member`, `Param` and `Description` keep their common
+  fields in `__slots__`, the remaining fields are packed
+- packed values replace dicts by a `Node` with a shared tuple of keys,
+  lists by tuples and `{"#text": ...}` entries by `Text` strings
+- short strings, e.g. ids, names and types, are interned
+
+The model is lossless, `to_json` restores the exact JSON shape including
+the order of the keys. `CompactMap` exposes the compounds of a scope as
+a mapping of such JSON dicts, which are created on access. With
+`--compact`, dispatch.py packs every class and namespace right after
+converting it, so the full JSON shape never exists for all compounds at
+once.
+"""
+import sys
+from collections.abc import Mapping
+
+# Strings up to this length are interned, longer ones are mostly prose
+INTERN_LENGTH = 64
+
+_keys = dict()
+_texts = dict()
+
+
+class Text(str):
+    """The text of an element without attributes, i.e. `{"#text": ...}`"""
+    __slots__ = ()
+
+
+class Node(object):
+    """A dict, with the tuple of keys shared between all nodes of the same layout"""
+    __slots__ = ("keys", "values")
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+    def __reduce__(self):
+        # share the keys again after unpickling, e.g. in the parent of a pool
+        return node, (self.keys, self.values)
+
+    def __getitem__(self, key):
+        try:
+            return self.values[self.keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+def node(keys, values) -> Node:
+    return Node(shared_keys(keys), values)
+
+
+def shared_keys(keys: tuple) -> tuple:
+    shared = _keys.get(keys)
+    if shared is None:
+        shared = _keys.setdefault(keys, tuple(sys.intern(k) for k in keys))
+    return shared
+
+
+def intern(s: str) -> str:
+    return sys.intern(s) if len(s) <= INTERN_LENGTH else s
+
+
+def text(s: str) -> Text:
+    if len(s) > INTERN_LENGTH:
+        return Text(s)
+    return _texts.setdefault(s, Text(s))
+
+
+def pack(value):
+    if isinstance(value, dict):
+        if len(value) == 1 and isinstance(value.get("#text"), str):
+            return text(value["#text"])
+        return Node(shared_keys(tuple(value)), tuple(pack(v) for v in value.values()))
+    if isinstance(value, list):
+        return tuple(pack(v) for v in value)
+    if isinstance(value, str):
+        return intern(value)
+    return value
+
+
+def unpack(value):
+    if isinstance(value, Text):
+        return {"#text": str(value)}
+    if isinstance(value, Node):
+        return dict(zip(value.keys, map(unpack, value.values)))
+    if isinstance(value, tuple):
+        return [unpack(v) for v in value]
+    return value
+
+
+class Record(object):
+    """Base of the typed model classes
+
+    `FIELDS` maps the JSON keys stored in slots to the slot names and
+    the functions converting their values. All other keys are packed
+    into `extra`. The original order of the keys is kept in `layout`.
+    """
+    __slots__ = ("layout", "extra")
+    FIELDS = dict()
+
+    @classmethod
+    def from_json(cls, data: dict):
+        record = cls.__new__(cls)
+        record.layout = shared_keys(tuple(data))
+        extra = dict()
+        for key, value in data.items():
+            try:
+                slot, convert, _ = cls.FIELDS[key]
+            except KeyError:
+                extra[key] = value
+                continue
+            setattr(record, slot, convert(value))
+        record.extra = pack(extra) if extra else None
+        return record
+
+    def __setstate__(self, state):
+        # share the layout again after unpickling, e.g. in the parent of a pool
+        for slot, value in state[1].items():
+            setattr(self, slot, value)
+        self.layout = shared_keys(self.layout)
+
+    def __getitem__(self, key):
+        """The stored value of `key`, e.g. the sections of a compound with their `Member` records"""
+        if key in self.FIELDS:
+            try:
+                return getattr(self, self.FIELDS[key][0])
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        """Replace the value of one of the `FIELDS` present in the record"""
+        if key not in self.layout:
+            raise KeyError(key)
+        slot, convert, _ = self.FIELDS[key]
+        setattr(self, slot, convert(value))
+
+    def to_json(self) -> dict:
+        extra = unpack(self.extra) if self.extra is not None else dict()
+        data = dict()
+        for key in self.layout:
+            try:
+                slot, _, export = self.FIELDS[key]
+            except KeyError:
+                data[key] = extra[key]
+                continue
+            data[key] = export(getattr(self, slot))
+        return data
+
+
+def field(slot, convert=pack, export=unpack):
+    return slot, convert, export
+
+
+class Description(Record):
+    __slots__ = ("paras",)
+    FIELDS = {"para": field("paras")}
+
+
+def description(value):
+    return Description.from_json(value) if isinstance(value, dict) else pack(value)
+
+
+def export_description(value):
+    return value.to_json() if isinstance(value, Description) else unpack(value)
+
+
+class Param(Record):
+    __slots__ = ("type", "declname", "defname", "defval")
+    FIELDS = {
+        "type": field("type"),
+        "declname": field("declname"),
+        "defname": field("defname"),
+        "defval": field("defval"),
+    }
+
+
+def params(value):
+    return tuple(Param.from_json(p) if isinstance(p, dict) else pack(p) for p in value)
+
+
+def export_params(value):
+    return [p.to_json() if isinstance(p, Param) else unpack(p) for p in value]
+
+
+class Member(Record):
+    __slots__ = ("id", "kind", "prot", "name", "type", "definition", "argsstring", "params",
+                 "brief", "detailed")
+    FIELDS = {
+        "@id": field("id", intern, str),
+        "@kind": field("kind", intern, str),
+        "@prot": field("prot", intern, str),
+        "name": field("name"),
+        "type": field("type"),
+        "definition": field("definition"),
+        "argsstring": field("argsstring"),
+        "param": field("params", params, export_params),
+        "briefdescription": field("brief", description, export_description),
+        "detaileddescription": field("detailed", description, export_description),
+    }
+
+
+def members(value):
+    """Pack the members in nested dicts, e.g. sections, keeping the dicts for lookups
+
+    References `{"@refid": id}` to members stored elsewhere, see
+    `add_inheritance_section` of dispatch.py, are packed as well. Packed
+    members are kept as they are.
+    """
+    if isinstance(value, dict):
+        if "@id" in value and "@kind" in value:
+            return Member.from_json(value)
+        if "@refid" in value:
+            return pack(value)
+        return {intern(k): members(v) for k, v in value.items()}
+    return pack(value)
+
+
+def export_members(value):
+    if isinstance(value, Member):
+        return value.to_json()
+    if isinstance(value, dict):
+        return {k: export_members(v) for k, v in value.items()}
+    return unpack(value)
+
+
+class Compound(Record):
+    __slots__ = ("id", "kind", "name", "sectiondef", "innerclass", "brief", "detailed")
+    FIELDS = {
+        "@id": field("id", intern, str),
+        "@kind": field("kind", intern, str),
+        "name": field("name"),
+        "sectiondef": field("sectiondef", members, export_members),
+        "innerclass": field("innerclass"),
+        "briefdescription": field("brief", description, export_description),
+        "detaileddescription": field("detailed", description, export_description),
+    }
+
+
+class CompactMap(Mapping):
+    """Compounds of a scope, stored compactly and exported on access
+
+    The exported dicts are not kept, so changes to them are not visible
+    in later accesses. Like `ShardedMap` of make_rst.py, the names and
+    inner classes needed to relate the classes are available as `index`.
+    """
+
+    def __init__(self, compounds: dict):
+        self.compounds = compounds
+
+    @classmethod
+    def from_json(cls, data: dict):
+        """Pack the compounds of `data`, removing them from `data` as it goes"""
+        compounds = dict()
+        for id in list(data):
+            compounds[intern(id)] = Compound.from_json(data.pop(id))
+        return cls(compounds)
+
+    @property
+    def index(self) -> dict:
+        return {id: {"name": unpack(c.name), "innerclass": unpack(getattr(c, "innerclass", ()))}
+                for id, c in self.compounds.items()}
+
+    def __getitem__(self, key):
+        return self.compounds[key].to_json()
+
+    def __iter__(self):
+        return iter(self.compounds)
+
+    def __len__(self):
+        return len(self.compounds)
+
+
+def compact(data: dict) -> dict:
+    """Pack the classes and namespaces of a variable map"""
+    return data | {scope: CompactMap.from_json(data[scope]) for scope in ["classes", "namespaces"]}
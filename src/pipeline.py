@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Generates the RST pages directly from the doxygen xml
+
+Runs dispatch.py and make_rst.py in a single process. The converted
+compounds are handed to the rendering as they are, instead of writing
+them as a JSON map and reading it back. The map can still be written
+as JSON for debugging, or as a binary map for later make_rst.py runs.
+"""
+import argparse
+import sys
+
+import dispatch
+import make_rst
+import profiling
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-d', '--doxygen', default=dispatch.simple_directory,
+                        help="Path to the doxygen generated xml directory")
+    parser.add_argument('-t', '--template', required=True,
+                        help="Path to the jinja2 template dir")
+    parser.add_argument('-o', '--output', required=True,
+                        help="Path to the output dir")
+    parser.add_argument('--title', default="C++ API Reference",
+                        help="The title of the index for the API")
+    parser.add_argument('-b', '--backend', choices=dispatch.backends.keys(), default="minidom",
+                        help="XML parser used for the compound files")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Number of processes used to convert the compounds and to render the pages")
+    parser.add_argument('--cache-dir', default=".dispatch_cache",
+                        help="Directory for the converted compounds, see dispatch.py. Used by "
+                             "default, relative to the current working directory")
+    parser.add_argument('--no-cache', action="store_true",
+                        help="Convert all compounds and don't update the cache")
+    parser.add_argument('--prefetch', type=int, default=0, metavar='N',
+                        help="Read up to N compound files ahead while converting, see dispatch.py")
+    parser.add_argument('--prefetch-mb', type=int, default=64, metavar='MB',
+                        help="Byte budget of the prefetched files, see dispatch.py")
+    parser.add_argument('--bytecode-cache', metavar='DIR',
+                        help="Directory to cache the compiled templates in")
+    parser.add_argument('--filter', action='append', metavar='PATTERN',
+                        help="Only render classes whose qualified name matches this glob pattern")
+    parser.add_argument('--limit', type=int,
+                        help="Render at most this many classes")
+    parser.add_argument('--compact', action="store_true",
+                        help="Pack each compound into the compact model of model.py as soon as it "
+                             "is converted. Lowers the peak memory to less than half, but packing takes time")
+    parser.add_argument('--dump-json', metavar='FILE',
+                        help="Also write the JSON map to this file, e.g. for debugging")
+    parser.add_argument('--dump-binary', metavar='FILE',
+                        help="Also write a binary map to this file, which make_rst.py reads "
+                             "quickly, e.g. while working on the templates")
+    profiling.add_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    profiler = profiling.from_args(args)
+    if profiler:
+        profiler.start()
+
+    ctx = dispatch.Context(directory=args.doxygen, backend=args.backend, jobs=args.jobs,
+                           cache_dir=None if args.no_cache else args.cache_dir, compact=args.compact,
+                           prefetch=args.prefetch, prefetch_bytes=args.prefetch_mb * 2 ** 20, profiler=profiler)
+    var_map = dispatch.dispatch_directory(ctx)
+
+    if args.dump_json:
+        with profiling.phase(profiler, "write json"), open(args.dump_json, "w") as f:
+            dispatch.write_json(var_map, f)
+    if args.dump_binary:
+        with profiling.phase(profiler, "write binary"):
+            dispatch.write_binary(var_map, args.dump_binary)
+
+    written, unchanged, removed = make_rst.render_pages(var_map, args.template, args.output,
+                                                        title=args.title, jobs=args.jobs,
+                                                        patterns=args.filter, limit=args.limit,
+                                                        bytecode_cache=args.bytecode_cache, profiler=profiler)
+    print(f"pipeline: {written} pages written, {unchanged} unchanged, {removed} removed",
+          file=sys.stderr)
+
+    if profiler:
+        profiler.stop()
+        profiler.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Phase timing and profiling for dispatch.py and make_rst.py
+
+A `Profiler` records the wall time and memory of each phase, named
+counters with their cumulative time, e.g. per xml tag, and the slowest
+items, e.g. compounds or pages. It can also run cProfile over the whole
+run and dump the statistics for `pstats`.
+
+The memory of a phase is the peak resident set size of the process at
+its end. Tracing the python allocations gives the peak within each phase
+instead, but slows allocation heavy code down by an order of magnitude.
+
+The scripts only create a profiler if profiling is requested, otherwise
+the profiling hooks are not installed at all.
+"""
+import cProfile
+import heapq
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from itertools import count
+
+
+class Profiler(object):
+    def __init__(self, slowest=10, dump=None, trace_memory=False):
+        self.phases = []
+        self.trace_memory = trace_memory
+        self.counters = dict()
+        self.slowest = slowest
+        self.items = dict()
+        self._order = count()
+        self.dump = dump
+        self.cprofile = cProfile.Profile() if dump else None
+
+    def start(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.cprofile:
+            self.cprofile.enable()
+
+    def stop(self):
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.dump)
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    def memory(self) -> int:
+        if self.trace_memory:
+            return tracemalloc.get_traced_memory()[1]
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    @contextmanager
+    def phase(self, name):
+        """Measure the wall time and memory of the enclosed code"""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start, self.memory()))
+
+    def add(self, counter, key, seconds):
+        """Count one occurrence of `key` taking `seconds`"""
+        entry = self.counters.setdefault(counter, dict()).setdefault(key, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def item(self, kind, name, seconds):
+        """Record the time of a single item, only the slowest are kept"""
+        heap = self.items.setdefault(kind, [])
+        entry = (seconds, next(self._order), name)
+        if len(heap) < self.slowest:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heappushpop(heap, entry)
+
+    def timed(self, counter, key, f):
+        """Wrap `f` to count its calls and time under `key`"""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                self.add(counter, key(*args, **kwargs) if callable(key) else key, time.perf_counter() - start)
+
+        return wrapper
+
+    def report(self, stream=sys.stderr):
+        memory = "peak traced" if self.trace_memory else "peak RSS"
+        print(f"{'phase':<30}{'wall':>10}{memory:>15}", file=stream)
+        for name, seconds, peak in self.phases:
+            print(f"{name:<30}{seconds:>9.3f}s{peak / 2 ** 20:>12.1f} MB", file=stream)
+        for counter, entries in self.counters.items():
+            print(f"\n{counter:<30}{'count':>10}{'total':>15}", file=stream)
+            for key, (n, seconds) in sorted(entries.items(), key=lambda e: -e[1][1]):
+                print(f"{key:<30}{n:>10}{seconds:>14.3f}s", file=stream)
+        for kind, heap in self.items.items():
+            print(f"\nslowest {kind}", file=stream)
+            for seconds, _, name in sorted(heap, reverse=True):
+                print(f"{seconds:>9.3f}s  {name}", file=stream)
+        if self.dump:
+            print(f"\ncProfile statistics written to {self.dump}", file=stream)
+
+
+@contextmanager
+def no_phase(name):
+    yield
+
+
+def phase(profiler, name):
+    """The phase of `profiler`, or a no-op if there is no profiler"""
+    return profiler.phase(name) if profiler else no_phase(name)
+
+
+def add_arguments(parser):
+    parser.add_argument('--profile', action='store_true',
+                        help="Report the wall time and memory of each phase, and further "
+                             "statistics, on stderr")
+    parser.add_argument('--profile-slowest', type=int, default=10, metavar='N',
+                        help="Number of slowest items listed by --profile")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Report the peak of the traced python allocations within each phase "
+                             "instead of the peak RSS. This slows the run down considerably")
+    parser.add_argument('--profile-dump', metavar='FILE',
+                        help="Also run cProfile and write its statistics to FILE, for pstats")
+
+
+def from_args(args):
+    """Create the profiler requested by the command line, or None"""
+    if not (args.profile or args.profile_memory or args.profile_dump):
+        return None
+    return Profiler(slowest=args.profile_slowest, dump=args.profile_dump, trace_memory=args.profile_memory)
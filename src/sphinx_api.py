@@ -0,0 +1,171 @@
+"""Sphinx extension rendering the API pages during the sphinx build
+
+Instead of writing the RST pages with make_rst.py before running sphinx,
+the extension loads the converted doxygen model once per build and
+renders each class page when sphinx reads it. Sphinx only discovers
+documents from files, so an empty stub is kept for every page in
+`api_dir`. Each page is hashed from its inputs, and only the pages whose
+hash changed since the last build are reported as outdated. This way
+sphinx's incremental and parallel builds work on the API pages directly.
+
+Configuration values:
+
+- `api_doxygen`: the doxygen xml directory, which is converted in-process
+- `api_map`: alternatively, a variable map written by dispatch.py
+- `api_templates`: the jinja2 template dir of make_rst.py
+- `api_dir`: the source dir of the pages, relative to the sphinx source dir
+- `api_title`, `api_filter`, `api_limit`: as the make_rst.py options
+"""
+import hashlib
+import json
+from functools import cache
+from pathlib import Path
+
+import dispatch
+import make_rst
+
+STUB = ".. This page is rendered by the sphinx_api extension when sphinx reads it\n"
+
+
+@cache
+def code_version() -> bytes:
+    """Hash of this extension, e.g. the index page depends on it"""
+    return hashlib.sha256(Path(__file__).read_bytes()).digest()
+
+
+def hash_json(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def hash_class(classes, key) -> str:
+    """Hash of a class, from its undecoded record for sharded and binary maps
+
+    Classes held in memory are converted in a deterministic order, so
+    their keys don't need to be sorted.
+    """
+    if hasattr(classes, "record"):
+        return hashlib.sha256(classes.record(key)).hexdigest()
+    return hashlib.sha256(json.dumps(classes[key]).encode()).hexdigest()
+
+
+class ApiPages(object):
+    """The API pages of one build
+
+    Holds the model and the hash of each page's inputs. The sphinx
+    processes of a parallel read are forked after the pages were
+    created, so they share them.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        if config.api_map:
+            var_map = make_rst.read_var_map(Path(app.confdir) / config.api_map)
+        else:
+            ctx = dispatch.Context(directory=str(Path(app.confdir) / config.api_doxygen),
+                                   jobs=app.parallel or 1,
+                                   cache_dir=str(Path(app.doctreedir) / "dispatch_cache"))
+            var_map = dispatch.dispatch_directory(ctx)
+        self.classes = var_map["classes"]
+        self.template_dir = Path(app.confdir) / config.api_templates
+        self.title = config.api_title
+        self.dir = config.api_dir
+
+        class_index = make_rst.read_class_index(self.classes)
+        self.relations = make_rst.relate_classes(class_index)
+        self.class_names = {id: c["name"] for id, c in class_index.items()}
+        selected = make_rst.select_classes(class_index, config.api_filter, config.api_limit)
+        self.index_classes = make_rst.index_classes(class_index, self.relations, selected)
+        self.pages = {f"{self.dir}/{key}": key for key in selected}
+        self.renderer = None
+
+        self.hashes = self.hash_pages(selected)
+
+    def hash_pages(self, selected) -> dict:
+        """Hash the inputs of each page
+
+        A class page depends on the class itself, its relations, the
+        classes it inherits members from, the templates and the code
+        converting and rendering the classes. Sharded and binary maps list
+        the classes a class inherits from in their index, so their classes
+        are hashed without decoding them.
+        """
+        shared = hash_json([make_rst.hash_templates(self.template_dir), make_rst.renderer_version().hex(),
+                            dispatch.converter_version().hex(), code_version().hex()])
+
+        index = getattr(self.classes, "index", dict())
+        class_hashes = dict()
+
+        def class_hash(key):
+            if key not in class_hashes and key in self.class_names:
+                class_hashes[key] = hash_class(self.classes, key)
+            return class_hashes.get(key)
+
+        hashes = {f"{self.dir}/index": hash_json([shared, self.title, self.index_classes])}
+        for key in selected:
+            if "owners" in index.get(key, dict()):
+                owners = index[key]["owners"]
+            else:
+                owners = dispatch.inherited_from(self.classes[key])
+            hashes[f"{self.dir}/{key}"] = hash_json(
+                [shared, class_hash(key), self.relations[key],
+                 [(owner_id, self.class_names.get(owner_id), class_hash(owner_id)) for owner_id in owners]])
+        return hashes
+
+    def write_stubs(self, srcdir: Path):
+        """Keep one stub file per page, and remove the stubs of former pages"""
+        out_dir = srcdir / self.dir
+        out_dir.mkdir(parents=True, exist_ok=True)
+        names = [f"{docname.rpartition('/')[2]}.rst" for docname in self.hashes]
+        for name in names:
+            make_rst.write_if_changed(out_dir / name, STUB)
+        make_rst.remove_stale_pages(out_dir, names)
+
+    def render(self, docname) -> str:
+        if self.renderer is None:
+            self.renderer = make_rst.ClassRenderer(self.template_dir, self.classes, self.class_names)
+        if docname == f"{self.dir}/index":
+            template = self.renderer.template.environment.get_template("index.rst.tmpl")
+            return template.render(title=self.title, classes=self.index_classes)
+        key = self.pages[docname]
+        return self.renderer.render(key, self.relations[key])
+
+
+api_pages = None
+
+
+def builder_inited(app):
+    global api_pages
+    api_pages = ApiPages(app)
+    api_pages.write_stubs(Path(app.srcdir))
+
+
+def source_read(app, docname, source):
+    if docname in api_pages.hashes:
+        source[0] = api_pages.render(docname)
+
+
+def env_get_outdated(app, env, added, changed, removed):
+    previous = getattr(env, "api_page_hashes", dict())
+    env.api_page_hashes = api_pages.hashes
+    return [docname for docname, page_hash in api_pages.hashes.items()
+            if docname not in added and previous.get(docname) != page_hash]
+
+
+def setup(app):
+    app.add_config_value("api_doxygen", "doxygen/xml", "env", str)
+    app.add_config_value("api_map", None, "env")
+    app.add_config_value("api_templates", "templates", "env", str)
+    app.add_config_value("api_dir", "cpp_api", "env", str)
+    app.add_config_value("api_title", "C++ API Reference", "env", str)
+    app.add_config_value("api_filter", None, "env")
+    app.add_config_value("api_limit", None, "env")
+
+    app.connect("builder-inited", builder_inited)
+    app.connect("source-read", source_read)
+    app.connect("env-get-outdated", env_get_outdated)
+
+    return {
+        "version": "0.1",
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
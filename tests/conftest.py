@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root / "src"))
+sys.path.insert(0, str(root / "bench"))
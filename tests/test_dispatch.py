@@ -0,0 +1,157 @@
+import argparse
+import io
+
+import pytest
+
+import dispatch as D
+import generate_xml
+import model
+
+
+def compound(members: str) -> bytes:
+    """A class compound with the given member definitions"""
+    return f"""<?xml version='1.0' encoding='UTF-8' standalone='no'?>
+<doxygen xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="compound.xsd" version="1.9.8" xml:lang="en-US">
+  <compounddef id="classA" kind="class" language="C++" prot="public">
+    <compoundname>A</compoundname>
+    <sectiondef kind="public-func">
+      {members}
+    </sectiondef>
+    <briefdescription>
+    </briefdescription>
+    <detaileddescription>
+    </detaileddescription>
+  </compounddef>
+</doxygen>
+""".encode()
+
+
+def member(body: str, type="<type>int</type>") -> str:
+    return f"""<memberdef kind="function" id="classA_1f" prot="public" static="no">
+        {type}
+        <definition>int A::f</definition>
+        <argsstring>()</argsstring>
+        <name>f</name>
+        <briefdescription>
+        </briefdescription>
+        <detaileddescription>
+          {body}
+        </detaileddescription>
+      </memberdef>"""
+
+
+EDGE_CASES = {
+    "nested computeroutput": member(
+        "<para>Use <computeroutput>foo(<computeroutput>Bar\\&lt;T\\&gt;</computeroutput>)</computeroutput>.</para>"),
+    "text tails": member(
+        "<para>Before <bold>bold</bold> between <emphasis>em</emphasis><sp/>after <ref refid=\"classB\" "
+        "kindref=\"compound\">B</ref> end</para>"),
+    "empty type": member("<para>text</para>", type="<type/>"),
+    "programlisting language": member(
+        "<para><programlisting><codeline><highlight class=\"normal\">{.py}</highlight></codeline>"
+        "<codeline><highlight class=\"keyword\">return</highlight><sp/>x</codeline></programlisting></para>"),
+    "programlisting filename": member(
+        "<para><programlisting filename=\".cpp\"><codeline><highlight class=\"normal\">int</highlight>"
+        "</codeline></programlisting></para>"),
+}
+
+
+def convert(backend, content: bytes):
+    ctx = D.Context(directory=".", backend=backend)
+    return D.backends[backend](io.BytesIO(content), ctx)
+
+
+@pytest.mark.parametrize("case", EDGE_CASES)
+def test_edge_cases_match_minidom(case):
+    content = compound(EDGE_CASES[case])
+    assert convert("iterparse", content) == convert("minidom", content)
+
+
+def test_edge_case_values():
+    def convert_member(case):
+        data = convert("iterparse", compound(EDGE_CASES[case]))["doxygen"]["compounddef"]
+        return data["sectiondef"]["public-func"]["classA_1f"]
+
+    assert convert_member("empty type")["type"] == {"#text": "void"}
+    listing = convert_member("programlisting language")["detaileddescription"]["para"][0][0]["programlisting"]
+    assert listing["style"] == ".py"
+    assert len(listing["para"][0]) == 1
+    listing = convert_member("programlisting filename")["detaileddescription"]["para"][0][0]["programlisting"]
+    assert listing["style"] == "cpp"
+
+
+@pytest.fixture(scope="module")
+def generated_tree(tmp_path_factory):
+    parser = argparse.ArgumentParser()
+    generate_xml.add_arguments(parser)
+    args = parser.parse_args([])
+    args.classes = 20
+    args.output = tmp_path_factory.mktemp("xml")
+    generate_xml.Generator(args).run()
+    return args.output
+
+
+def test_generated_tree_matches_minidom(generated_tree):
+    results = {backend: D.dispatch_directory(D.Context(directory=str(generated_tree), backend=backend))
+               for backend in D.backends}
+    assert results["minidom"]["classes"]
+    assert results["iterparse"] == results["minidom"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_compact_matches_dicts(generated_tree, jobs):
+    plain = D.dispatch_directory(D.Context(directory=str(generated_tree)))
+    compact = D.dispatch_directory(D.Context(directory=str(generated_tree), compact=True, jobs=jobs))
+    for scope in ["classes", "namespaces"]:
+        assert isinstance(compact[scope], model.CompactMap)
+        assert list(compact[scope]) == list(plain[scope])
+        for id, c in plain[scope].items():
+            assert list(compact[scope][id].items()) == list(c.items())
+    assert compact["globals"] == plain["globals"]
+
+
+def test_prune_cache_keeps_other_files(tmp_path):
+    for name in ["classA.dispatch.json", "classGone.dispatch.json", "cpp_map.json"]:
+        (tmp_path / name).write_text("{}")
+    assert D.prune_cache(tmp_path, ["xml/classA.xml"]) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["classA.dispatch.json", "cpp_map.json"]
+
+
+def class_compound(id, members=(), bases=()):
+    return {"@id": id, "name": id, "innerclass": [],
+            "basecompoundref": [{"@refid": base, "#text": base} for base in bases],
+            "sectiondef": {"public-func": {member_id: function(member_id) for member_id in members}}}
+
+
+def function(member_id):
+    return {"@id": member_id, "@kind": "function", "name": member_id}
+
+
+def inheritance(classes, compact):
+    """The public functions of the classes after the inheritance pass"""
+    if compact:
+        classes = [model.Compound.from_json(c) for c in classes]
+    data = {"classes": {c["@id"]: c for c in classes}}
+    D.add_inheritance_section(data)
+    if compact:
+        return {id: model.export_members(c.sectiondef)["public-func"] for id, c in data["classes"].items()}
+    return {id: c["sectiondef"]["public-func"] for id, c in data["classes"].items()}
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_inheritance_references_owner(compact):
+    sections = inheritance([class_compound("classBase", ["classBase_1af"]),
+                            class_compound("classD", ["classBase_1af", "classD_1ag"], ["classBase"])], compact)
+    assert sections["classBase"]["default"] == {"classBase_1af": function("classBase_1af")}
+    assert sections["classD"]["inherited"] == {"classBase": {"classBase_1af": {"@refid": "classBase_1af"}}}
+    assert sections["classD"]["default"] == {"classD_1ag": function("classD_1ag")}
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_inheritance_from_undocumented_base(compact):
+    # both classes derive from classHidden, which is not part of the index
+    sections = inheritance([class_compound("classD1", ["classHidden_1af"], ["classHidden"]),
+                            class_compound("classD2", ["classHidden_1af"], ["classHidden"])], compact)
+    for id in ["classD1", "classD2"]:
+        assert sections[id]["inherited"] == dict()
+        assert sections[id]["default"] == {"classHidden_1af": function("classHidden_1af")}
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+import make_rst as M
+
+
+def reference_normalize(s: str, scope: str) -> str:
+    """The former normalize filter, with the missing advance added"""
+
+    def remove_matching_braces(s: str) -> str:
+        if len(s) == 0:
+            return str()
+        if s[0] != "<":
+            return s
+        nesting_level = -1
+        for i, c in enumerate(s):
+            match (c, nesting_level):
+                case (">", 0):
+                    return s[i + 1:]
+                case (">", _):
+                    nesting_level = nesting_level - 1
+                case ("<", _):
+                    nesting_level = nesting_level + 1
+        raise RuntimeError(f"Encountered unbalanced template brackets in string: {s}")
+
+    idx = 0
+    while 0 <= idx < len(s):
+        idx = s.find(scope, idx)
+        if idx >= 0:
+            r = remove_matching_braces(s[idx + len(scope):])
+            if len(r) >= 2 and r[:2] == "::":
+                s = s[:idx] + r[2:]
+            else:
+                idx += 1
+    return s
+
+
+@pytest.mark.parametrize("s, scope, expected", [
+    ("test::A test::A::fn", "test::A", "test::A fn"),
+    ("test::A", "test::A", "test::A"),
+    ("gko::matrix::Dense::fn", "gko::matrix", "Dense::fn"),
+    ("gko::LinOp::apply", "", "gko::LinOp::apply"),
+    ("X<Y<Z>>::fn(X<int>::value_type)", "X", "fn(value_type)"),
+    ("ns::X<Y<Z<int>>, W>::type", "ns::X", "type"),
+    ("", "ns", ""),
+])
+def test_normalize(s, scope, expected):
+    assert M.normalize(s, scope) == expected
+    assert M.strip_scope(s, scope) == expected
+
+
+@pytest.mark.parametrize("s", ["X<Y<Z>::fn", "a X<int"])
+def test_normalize_unbalanced_brackets(s):
+    with pytest.raises(RuntimeError):
+        M.strip_scope(s, "X")
+
+
+def test_normalize_matches_reference():
+    rng = random.Random(1337)
+    tokens = ["A", "B", "::", "<", ">", " ", ",", "A<", "::A"]
+    for _ in range(5000):
+        s = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 16)))
+        scope = rng.choice(["A", "A::B", "B<A>"])
+        try:
+            expected = reference_normalize(s, scope)
+        except RuntimeError:
+            with pytest.raises(RuntimeError):
+                M.strip_scope(s, scope)
+            continue
+        assert M.strip_scope(s, scope) == expected, (s, scope)